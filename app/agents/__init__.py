@@ -7,7 +7,7 @@ from .main_agent import MainHypatiaAgent
 from .factory import HypatiaAgentFactory
 from .specialized_agents import KnowledgeAgent, SalesAgent, AnalyticsAgent
 from .tools import CourseSearchTool, PromotionSearchTool, UserHistoryTool
-from .utils import safe_stringify
+from .utils import safe_stringify, extract_reply_text, normalize_query, compact_prompt
 
 # Exportar las clases principales que se usan externamente
 __all__ = [
@@ -19,5 +19,8 @@ __all__ = [
     'CourseSearchTool',
     'PromotionSearchTool',
     'UserHistoryTool',
-    'safe_stringify'
+    'safe_stringify',
+    'extract_reply_text',
+    'normalize_query',
+    'compact_prompt'
 ]
@@ -8,7 +8,7 @@ from .main_agent import MainHypatiaAgent
 from .factory import HypatiaAgentFactory
 from .specialized_agents import KnowledgeAgent, SalesAgent, AnalyticsAgent
 from .tools import CourseSearchTool, PromotionSearchTool, UserHistoryTool
-from .utils import safe_stringify
+from .utils import safe_stringify, extract_reply_text, normalize_query
 
 # Re-exportar para compatibilidad con código existente
 __all__ = [
@@ -20,5 +20,7 @@ __all__ = [
     'CourseSearchTool',
     'PromotionSearchTool', 
     'UserHistoryTool',
-    'safe_stringify'
+    'safe_stringify',
+    'extract_reply_text',
+    'normalize_query'
 ]
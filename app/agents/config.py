@@ -2,13 +2,11 @@
 Configuración base para Langroid Multi-Agent System
 """
 import os
-from dotenv import load_dotenv
 from langroid.language_models import OpenAIGPTConfig
 from langroid.vector_store import QdrantDBConfig
 from langroid.embedding_models import OpenAIEmbeddingsConfig
 from app.config import settings
-
-load_dotenv()
+from app.agents.utils import compact_prompt
 
 class LangroidConfig:
     """Configuración centralizada para Langroid"""
@@ -153,6 +151,7 @@ class LangroidConfig:
         - Registrar frecuencia de consultas de inscripción
         """
     }
+    SYSTEM_PROMPTS = {name: compact_prompt(prompt) for name, prompt in SYSTEM_PROMPTS.items()}
 
 # Instancia global de configuración
 langroid_config = LangroidConfig()
@@ -1,16 +1,22 @@
 """
 Agente principal que orquesta el sistema multi-agente
 """
+import asyncio
 import logging
 import json
 import hashlib
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+from cachetools import TTLCache
+from openai import AsyncOpenAI
 from langroid import ChatAgent, ChatAgentConfig
 from langroid.agent.tools import ForwardTool
 
 from app.agents.config import langroid_config
+from app.config import Config
+from app.services.semantic_cache import SemanticCache
 from .specialized_agents import KnowledgeAgent, SalesAgent, AnalyticsAgent
-from .utils import safe_stringify
+from .utils import safe_stringify, extract_reply_text, normalize_query
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +28,19 @@ if not logger.hasHandlers():
     logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+# Mensajes que son solo un saludo al abrir la conversación: el prompt principal fija la respuesta, no hace falta RAG ni LLM
+_GREETING_PATTERN = re.compile(
+    r"[¡!\s]*(?:hola|holi|buen[oa]s(?: d[ií]as| tardes| noches)?|saludos|hey|hi|hello)"
+    r"(?: hypatia)?[\s!.,👋😊]*"
+)
+_GREETING_REPLY = "¡Hola! 👋 Soy HypatIA 🎓, tu asistente virtual de DeepLearning.AI. ¿Qué te gustaría aprender hoy? 💻✨"
+
+# Respuesta al usuario cuando falla el RAG o el LLM (REST, WhatsApp y WebSocket)
+_ERROR_REPLY = "Lo siento, hubo un error procesando tu consulta. Por favor intenta de nuevo."
+
+# Mensajes del historial LLM que se conservan tras el system message (últimos turnos)
+_MAX_HISTORY_MESSAGES = 8
+
 class MainHypatiaAgent(ChatAgent):
     """Agente principal que orquesta el sistema multi-agente"""
     
@@ -56,6 +75,20 @@ class MainHypatiaAgent(ChatAgent):
         # Herramientas habilitadas
         self.enable_message(ForwardTool)
         
+        # Cache de respuestas finales por (usuario, mensaje normalizado)
+        self._response_cache: TTLCache = TTLCache(maxsize=2048, ttl=3600)
+        # Cache semántica: consultas parafraseadas reutilizan la respuesta sin llamar al LLM
+        self._semantic_cache = SemanticCache(dimension=Config.EMBEDDING_DIMENSION)
+        
+        # Usuarios con turnos recientes: un saludo a mitad de conversación sí pasa por el LLM
+        self._recent_users: TTLCache = TTLCache(maxsize=10000, ttl=1800)
+        
+        # Generaciones en curso por clave de respuesta, compartidas por consultas idénticas concurrentes
+        self._inflight: Dict[Tuple[Optional[int], str], asyncio.Future] = {}
+        
+        # Cliente OpenAI para respuestas en streaming (se crea en el primer uso)
+        self._stream_client: Optional[AsyncOpenAI] = None
+        
     def get_conversation_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas de conversación del analytics agent"""
         try:
@@ -79,50 +112,108 @@ class MainHypatiaAgent(ChatAgent):
             }
 
 
+    @staticmethod
+    def _response_key(message: str, user_id: Optional[int]) -> Tuple[Optional[int], str]:
+        """Clave de la cache de respuestas finales: tupla (usuario, consulta normalizada), sin formatear ni hashear"""
+        return user_id, normalize_query(message)
+
+    @staticmethod
+    def _query_embedding(message: str) -> List[float]:
+        """Embedding de la consulta con el modelo compartido del ServiceManager"""
+        from app.services.service_manager import service_manager
+        return service_manager.get_embedding_service().encode_query(message)
+
+    def _is_opening_greeting(self, message: str, user_id: Optional[int]) -> bool:
+        """Saludo suelto sin turnos previos del usuario; registra el turno actual"""
+        first_turn = user_id not in self._recent_users
+        self._recent_users[user_id] = True
+        return first_turn and _GREETING_PATTERN.fullmatch(normalize_query(message)) is not None
+
+    def _trim_history(self):
+        """Conserva el system message y los últimos turnos: el historial compartido no crece sin límite"""
+        history = self.message_history
+        if len(history) > _MAX_HISTORY_MESSAGES + 1:
+            del history[1:len(history) - _MAX_HISTORY_MESSAGES]
+
+    def _build_context_prompt(self, message: str, user_id: Optional[int] = None) -> str:
+        """Consulta knowledge (con cache Redis) y sales agents y arma el prompt final"""
+        # Usar ServiceManager para obtener instancias singleton optimizadas
+        from app.services.service_manager import service_manager
+        redis_cache = service_manager.get_redis_cache()
+
+        # Resultado de búsqueda por consulta normalizada: variantes triviales comparten entrada
+        cache_key = f"cursos:busqueda:{hashlib.blake2b(normalize_query(message).encode(), digest_size=16).hexdigest()}"
+        cached_result = redis_cache.get(cache_key)
+        if cached_result:
+            logger.info("[CACHE HIT] Resultado recuperado desde Redis para clave: %s", cache_key)
+            knowledge_response = cached_result
+        else:
+            logger.info("[CACHE MISS] Generando nuevo resultado para clave: %s", cache_key)
+            knowledge_response = self.knowledge_agent.handle_message_fallback(message)
+            knowledge_response = safe_stringify(knowledge_response)
+            if isinstance(knowledge_response, (dict, list)):
+                knowledge_response = json.dumps(knowledge_response, ensure_ascii=False)
+            if knowledge_response is None:
+                knowledge_response = ""
+            redis_cache.set(cache_key, knowledge_response, expire_seconds=600)  # Cache por 10 minutos
+
+        self.analytics_agent.track_conversation(message, "")
+        sales_response = self.sales_agent.handle_message_fallback(message, user_id)
+        sales_response = safe_stringify(sales_response)
+        if isinstance(sales_response, (dict, list)):
+            sales_response = json.dumps(sales_response, ensure_ascii=False)
+
+        # Sin sangría: este texto se envía al LLM en cada consulta
+        context_prompt = (
+            f"Consulta del usuario: {message}\n\n"
+            f"Información de cursos encontrada:\n{knowledge_response}\n\n"
+            f"Recomendaciones de ventas:\n{sales_response}\n\n"
+            "Basándote en esta información, proporciona una respuesta completa y útil al usuario.\n"
+            "Mantén el tono amigable y comercial de DeepLearning.IA 🥋."
+        )
+        return context_prompt
+
     async def handle_user_message(self, message: str, user_id: Optional[int] = None, 
                                   conversation_context: Optional[Dict] = None) -> str:
         """Maneja mensaje de usuario orquestando múltiples agentes, usando Redis para cacheo de resultados."""
-        import time
-        start_time = time.time()
+        if self._is_opening_greeting(message, user_id):
+            self.analytics_agent.track_conversation(message, _GREETING_REPLY)
+            return _GREETING_REPLY
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        response_key = self._response_key(message, user_id)
+        cached_response = self._response_cache.get(response_key)
+        if cached_response is not None:
+            logger.info("[RESPONSE CACHE HIT] Respuesta reutilizada para usuario: %s", user_id)
+            self.analytics_agent.track_conversation(message, cached_response)
+            return cached_response
+        # La misma consulta ya en curso (reintento, doble envío) espera esa respuesta en vez de otra llamada al LLM.
+        # shield: cancelar a un llamador no cancela la generación que comparten los demás
+        pending = self._inflight.get(response_key)
+        if pending is not None:
+            logger.info("[INFLIGHT HIT] Esperando respuesta en curso para usuario: %s", user_id)
+            final_response = await asyncio.shield(pending)
+            self.analytics_agent.track_conversation(message, final_response)
+            return final_response
+        task = asyncio.ensure_future(self._generate_response(message, user_id, response_key, start_time))
+        self._inflight[response_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(response_key, None))
+        return await asyncio.shield(task)
+
+    async def _generate_response(self, message: str, user_id: Optional[int], response_key: Tuple[Optional[int], str],
+                                 start_time: float) -> str:
+        """Cache semántica, contexto de agentes y llamada al LLM para una consulta sin respuesta cacheada"""
+        loop = asyncio.get_running_loop()
         try:
-            # Usar ServiceManager para obtener instancias singleton optimizadas
-            from app.services.service_manager import service_manager
-            redis_cache = service_manager.get_redis_cache()
-
-            # Mejorar la clave de cache usando hash para evitar colisiones y asegurar unicidad
-            cache_key = f"cursos:busqueda:{hashlib.sha256(message.strip().lower().encode()).hexdigest()}"
-            cached_result = redis_cache.get(cache_key)
-            if cached_result:
-                logger.info(f"[CACHE HIT] Resultado recuperado desde Redis para clave: {cache_key}")
-                knowledge_response = cached_result
-            else:
-                logger.info(f"[CACHE MISS] Generando nuevo resultado para clave: {cache_key}")
-                knowledge_response = self.knowledge_agent.handle_message_fallback(message)
-                knowledge_response = safe_stringify(knowledge_response)
-                if isinstance(knowledge_response, (dict, list)):
-                    knowledge_response = json.dumps(knowledge_response, ensure_ascii=False)
-                if knowledge_response is None:
-                    knowledge_response = ""
-                redis_cache.set(cache_key, knowledge_response, expire_seconds=600)  # Cache por 10 minutos
-
-            self.analytics_agent.track_conversation(message, "")
-            sales_response = self.sales_agent.handle_message_fallback(message, user_id)
-            sales_response = safe_stringify(sales_response)
-            if isinstance(sales_response, (dict, list)):
-                sales_response = json.dumps(sales_response, ensure_ascii=False)
-
-            context_prompt = f"""
-            Consulta del usuario: {message}
-
-            Información de cursos encontrada:
-            {knowledge_response}
-
-            Recomendaciones de ventas:
-            {sales_response}
-
-            Basándote en esta información, proporciona una respuesta completa y útil al usuario.
-            Mantén el tono amigable y comercial de DeepLearning.IA 🥋.
-            """
+            # Embedding, Redis y Qdrant son síncronos: en un hilo para no bloquear el event loop
+            query_embedding = await asyncio.to_thread(self._query_embedding, message)
+            semantic_response = self._semantic_cache.get(query_embedding, user_id)
+            if semantic_response is not None:
+                logger.info("[SEMANTIC CACHE HIT] Respuesta reutilizada para usuario: %s", user_id)
+                self.analytics_agent.track_conversation(message, semantic_response)
+                self._response_cache[response_key] = semantic_response
+                return semantic_response
+            context_prompt = await asyncio.to_thread(self._build_context_prompt, message, user_id)
             try:
                 final_response = await self.llm_response_async(context_prompt)
             except Exception as e:
@@ -142,12 +233,84 @@ class MainHypatiaAgent(ChatAgent):
                         return "El contexto de la conversación era demasiado largo y ha sido reiniciado. Por favor, intenta de nuevo tu consulta."
                 else:
                     logger.error(f"Error in MainHypatiaAgent: {error_msg}")
-                    return "Lo siento, hubo un error procesando tu consulta. Por favor intenta de nuevo."
+                    return _ERROR_REPLY
 
+            self._trim_history()
+            # Normalizar una sola vez: los consumidores reciben siempre str
+            final_response = extract_reply_text(final_response) if final_response is not None else ""
             self.analytics_agent.track_conversation(message, final_response)
-            elapsed = time.time() - start_time
-            logger.info(f"[RESPONSE TIME] El agente tardó {elapsed:.2f} segundos en generar la respuesta.")
+            self._response_cache[response_key] = final_response
+            self._semantic_cache.set(query_embedding, final_response, user_id)
+            logger.info("[RESPONSE TIME] El agente tardó %.2f segundos en generar la respuesta.", loop.time() - start_time)
             return final_response
         except Exception as e:
             logger.error(f"Error in MainHypatiaAgent: {str(e)}")
-            return "Lo siento, hubo un error procesando tu consulta. Por favor intenta de nuevo."
+            return _ERROR_REPLY
+
+    async def stream_user_message(self, message: str, user_id: Optional[int] = None) -> AsyncIterator[str]:
+        """Igual que handle_user_message, pero emite la respuesta del LLM token a token"""
+        if self._is_opening_greeting(message, user_id):
+            self.analytics_agent.track_conversation(message, _GREETING_REPLY)
+            yield _GREETING_REPLY
+            return
+        
+        response_key = self._response_key(message, user_id)
+        cached_response = self._response_cache.get(response_key)
+        if cached_response is not None:
+            self.analytics_agent.track_conversation(message, cached_response)
+            yield cached_response
+            return
+        # Si la misma consulta ya se está generando por REST/WhatsApp, se comparte esa respuesta
+        pending = self._inflight.get(response_key)
+        if pending is not None:
+            final_response = await asyncio.shield(pending)
+            self.analytics_agent.track_conversation(message, final_response)
+            yield final_response
+            return
+        
+        parts = []
+        try:
+            query_embedding = await asyncio.to_thread(self._query_embedding, message)
+            semantic_response = self._semantic_cache.get(query_embedding, user_id)
+            if semantic_response is not None:
+                self.analytics_agent.track_conversation(message, semantic_response)
+                self._response_cache[response_key] = semantic_response
+                yield semantic_response
+                return
+            
+            context_prompt = await asyncio.to_thread(self._build_context_prompt, message, user_id)
+            if self._stream_client is None:
+                # Reutiliza el pool HTTP/2 compartido; el timeout del LLM se aplica por petición
+                from app.services.service_manager import service_manager
+                self._stream_client = AsyncOpenAI(
+                    api_key=self.config.llm.api_key,
+                    timeout=self.config.llm.timeout,
+                    http_client=service_manager.get_http_client()
+                )
+            stream = await self._stream_client.chat.completions.create(
+                model=self.config.llm.chat_model,
+                messages=[
+                    {"role": "system", "content": self.config.system_message},
+                    {"role": "user", "content": context_prompt}
+                ],
+                max_tokens=self.config.llm.max_output_tokens,
+                temperature=self.config.llm.temperature,
+                stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            # Mismo fallback que handle_user_message; una respuesta cortada no se cachea
+            logger.error("Error in MainHypatiaAgent (stream): %s", e)
+            yield ("\n\n" if parts else "") + _ERROR_REPLY
+            return
+        
+        final_response = "".join(parts)
+        self.analytics_agent.track_conversation(message, final_response)
+        self._response_cache[response_key] = final_response
+        self._semantic_cache.set(query_embedding, final_response, user_id)
@@ -2,6 +2,8 @@
 Agentes especializados del sistema
 """
 import logging
+import re
+from collections import deque
 from typing import Optional
 from langroid import ChatAgent, ChatAgentConfig
 from langroid.agent.tools import PassTool
@@ -10,6 +12,27 @@ from .tools import CourseSearchTool, PromotionSearchTool, UserHistoryTool
 
 logger = logging.getLogger(__name__)
 
+# Palabras clave precompiladas: una sola pasada por mensaje en lugar de N búsquedas de subcadenas.
+# Anclan al inicio de palabra (admiten plurales) para no coincidir dentro de otra palabra
+_PROMOTION_PATTERN = re.compile(r"\b(?:promocion|descuento|oferta)")
+# Señales del AnalyticsAgent en un solo autómata: el grupo que coincide indica la señal
+_ANALYTICS_PATTERN = re.compile(
+    r"\b(?:(?P<positive>gracias|perfecto|excelente|me gusta)|(?P<conversion>comprar|precio|disponible))"
+)
+
+# Reglas de recomendación en orden de prioridad; el grupo que coincide indica la regla
+_SALES_RECOMMENDATIONS = (
+    ("principiante|básico", "¿Te interesaría ver nuestros cursos de nivel intermedio después?"),
+    ("intermedio|avanzado", "¿Has considerado complementar con cursos de aplicaciones prácticas?"),
+    ("deep learning", "¿Te gustaría explorar también nuestros cursos de Machine Learning?"),
+    ("machine learning", "¿Has pensado en profundizar con nuestros cursos de Deep Learning?"),
+    ("python", "¿Te interesaría ver cursos de frameworks específicos como TensorFlow o PyTorch?"),
+)
+_SALES_PATTERN = re.compile(r"\b(?:" + "|".join(f"({keywords})" for keywords, _ in _SALES_RECOMMENDATIONS) + ")")
+
+# Máximo de señales de satisfacción/conversión retenidas por el AnalyticsAgent
+_METRICS_HISTORY_SIZE = 1000
+
 class KnowledgeAgent(ChatAgent):
     """Agente especializado en búsqueda de conocimiento"""
     
@@ -23,7 +46,7 @@ class KnowledgeAgent(ChatAgent):
         """Maneja consultas de conocimiento"""
         try:
             # Determinar tipo de consulta
-            if "promocion" in msg.lower() or "descuento" in msg.lower() or "oferta" in msg.lower():
+            if _PROMOTION_PATTERN.search(msg.lower()):
                 # Buscar promociones pasando el mensaje del usuario
                 promotion_tool = PromotionSearchTool(query=msg)
                 return promotion_tool.handle()
@@ -49,20 +72,10 @@ class SalesAgent(ChatAgent):
         """Maneja lógica de ventas"""
         try:
             # Analizar mensaje para oportunidades de recomendación de cursos
-            recommendations = []
-            # Keywords para cursos complementarios
-            if "principiante" in msg.lower() or "básico" in msg.lower():
-                recommendations.append("¿Te interesaría ver nuestros cursos de nivel intermedio después?")
-            elif "intermedio" in msg.lower() or "avanzado" in msg.lower():
-                recommendations.append("¿Has considerado complementar con cursos de aplicaciones prácticas?")
-            elif "deep learning" in msg.lower():
-                recommendations.append("¿Te gustaría explorar también nuestros cursos de Machine Learning?")
-            elif "machine learning" in msg.lower():
-                recommendations.append("¿Has pensado en profundizar con nuestros cursos de Deep Learning?")
-            elif "python" in msg.lower():
-                recommendations.append("¿Te interesaría ver cursos de frameworks específicos como TensorFlow o PyTorch?")
-            if recommendations:
-                return f"Sugerencias adicionales: {' '.join(recommendations)}"
+            # Keywords para cursos complementarios: gana la regla de mayor prioridad presente
+            rule = min((m.lastindex for m in _SALES_PATTERN.finditer(msg.lower())), default=None)
+            if rule is not None:
+                return f"Sugerencias adicionales: {_SALES_RECOMMENDATIONS[rule - 1][1]}"
             else:
                 return "Continuando con la conversación..."
         except Exception as e:
@@ -75,25 +88,29 @@ class AnalyticsAgent(ChatAgent):
     
     def __init__(self, config: ChatAgentConfig):
         super().__init__(config)
+        # Historial acotado: las señales más antiguas se descartan en lugar de crecer sin límite
         self.conversation_metrics = {
             "total_messages": 0,
-            "user_satisfaction": [],
-            "conversion_indicators": []
+            "user_satisfaction": deque(maxlen=_METRICS_HISTORY_SIZE),
+            "conversion_indicators": deque(maxlen=_METRICS_HISTORY_SIZE)
         }
         
     def track_conversation(self, user_msg: str, bot_response: str):
         """Rastrea métricas de conversación"""
         self.conversation_metrics["total_messages"] += 1
         
-        # Detectar indicadores de satisfacción
-        positive_indicators = ["gracias", "perfecto", "excelente", "me gusta"]
-        if any(indicator in user_msg.lower() for indicator in positive_indicators):
+        # Detectar indicadores de satisfacción y conversión en una sola pasada
+        signals = {m.lastgroup for m in _ANALYTICS_PATTERN.finditer(user_msg.lower())}
+        if "positive" in signals:
             self.conversation_metrics["user_satisfaction"].append("positive")
             
-        conversion_indicators = ["comprar", "precio", "disponible"]
-        if any(indicator in user_msg.lower() for indicator in conversion_indicators):
+        if "conversion" in signals:
             self.conversation_metrics["conversion_indicators"].append(user_msg[:50])
     
     def get_metrics(self):
         """Obtiene métricas actuales"""
-        return self.conversation_metrics.copy()
+        return {
+            "total_messages": self.conversation_metrics["total_messages"],
+            "user_satisfaction": list(self.conversation_metrics["user_satisfaction"]),
+            "conversion_indicators": list(self.conversation_metrics["conversion_indicators"])
+        }
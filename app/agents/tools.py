@@ -2,11 +2,61 @@
 Herramientas personalizadas para los agentes
 """
 import logging
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 import langroid as lr
 
 logger = logging.getLogger(__name__)
 
+# Campos del payload que lee cada herramienta: Qdrant no envía el resto (p. ej. 'content')
+_COURSE_PAYLOAD_FIELDS = (
+    "tipo", "metadata", "disponible", "nombre", "descripcion", "titulo",
+    "nivel", "idioma", "precio", "cupo", "promociones_activas"
+)
+_PROMOTION_PAYLOAD_FIELDS = (
+    "descripcion", "descuento", "fecha_fin", "total_cursos",
+    "metadata", "cursos_nombres", "cursos_detalles"
+)
+
+def _payload_field(payload: dict, field: str, default: Any = 'N/A') -> Any:
+    """Campo del payload con respaldo en su metadata"""
+    return payload.get(field) or payload.get('metadata', {}).get(field, default)
+
+def _format_categoria(payload: dict) -> str:
+    return (
+        f"Categoría: {payload.get('nombre', 'N/A')}\n"
+        f"Descripción: {payload.get('descripcion', 'N/A')}\n"
+    )
+
+def _format_curso(payload: dict) -> str:
+    # titulo y descripcion pueden venir en el payload o en su metadata
+    formatted_result = (
+        f"Curso: {_payload_field(payload, 'titulo')}\n"
+        f"Descripción: {_payload_field(payload, 'descripcion')}\n"
+        f"Nivel: {_payload_field(payload, 'nivel')}\n"
+        f"Idioma: {_payload_field(payload, 'idioma')}\n"
+        f"Precio: ${_payload_field(payload, 'precio')}\n"
+        f"Cupo disponible: {_payload_field(payload, 'cupo')} estudiantes\n"
+        f"Disponible: {'Sí' if payload.get('disponible', False) else 'No'}\n"
+    )
+    promociones = _payload_field(payload, 'promociones_activas', '')
+    if promociones:
+        formatted_result += f"Promociones activas: {promociones}\n"
+    return formatted_result
+
+def _format_promocion(payload: dict) -> str:
+    return (
+        f"Promoción: {payload.get('nombre', 'N/A')}\n"
+        f"Descripción: {payload.get('descripcion', 'N/A')}\n"
+        f"Descuento: {payload.get('descuentoPorcentaje', 'N/A')}%\n"
+    )
+
+# Formateador de resultados por tipo de documento
+_RESULT_FORMATTERS: Dict[str, Callable[[dict], str]] = {
+    "categoria": _format_categoria,
+    "curso": _format_curso,
+    "promocion": _format_promocion,
+}
+
 class CourseSearchTool(lr.ToolMessage):
     """Herramienta para búsqueda de cursos"""
     request: str = "course_search"
@@ -28,63 +78,28 @@ class CourseSearchTool(lr.ToolMessage):
             # Buscar documentos similares
             results = qdrant_service.search_similar(
                 query_embedding,
-                limit=self.max_results
+                limit=self.max_results,
+                payload_fields=_COURSE_PAYLOAD_FIELDS
             )
 
             if not results:
                 return "No se encontraron resultados que coincidan con tu búsqueda."
 
             # Determinar el tipo de información predominante en los resultados
-            tipo_predominante = None
+            tipos = [result.get("tipo") or result.get("metadata", {}).get("type") for result in results]
             tipo_count = {"curso": 0, "categoria": 0, "promocion": 0}
-            for result in results:
-                tipo = result.get("tipo") or result.get("metadata", {}).get("type")
+            for tipo in tipos:
                 if tipo in tipo_count:
                     tipo_count[tipo] += 1
             tipo_predominante = max(tipo_count, key=tipo_count.get) if any(tipo_count.values()) else None
 
-            formatted_results = []
-            for result in results:
-                tipo = result.get("tipo") or result.get("metadata", {}).get("type")
-                payload = result.get("payload", {})
-                disponible_final = payload.get("disponible", False)
-
-                if tipo_predominante == "categoria" and tipo == "categoria":
-                    # Responder sobre categoría
-                    formatted_result = (
-                        f"Categoría: {payload.get('nombre', 'N/A')}\n"
-                        f"Descripción: {payload.get('descripcion', 'N/A')}\n"
-                    )
-                    formatted_results.append(formatted_result)
-                elif tipo_predominante == "curso" and tipo == "curso":
-                        # Responder sobre curso asegurando que titulo y descripcion se obtienen correctamente
-                        titulo = payload.get('titulo') or payload.get('metadata', {}).get('titulo', 'N/A')
-                        descripcion = payload.get('descripcion') or payload.get('metadata', {}).get('descripcion', 'N/A')
-                        nivel = payload.get('nivel') or payload.get('metadata', {}).get('nivel', 'N/A')
-                        idioma = payload.get('idioma') or payload.get('metadata', {}).get('idioma', 'N/A')
-                        precio = payload.get('precio') or payload.get('metadata', {}).get('precio', 'N/A')
-                        cupo = payload.get('cupo') or payload.get('metadata', {}).get('cupo', 'N/A')
-                        promociones = payload.get('promociones_activas') or payload.get('metadata', {}).get('promociones_activas', '')
-                        formatted_result = (
-                            f"Curso: {titulo}\n"
-                            f"Descripción: {descripcion}\n"
-                            f"Nivel: {nivel}\n"
-                            f"Idioma: {idioma}\n"
-                            f"Precio: ${precio}\n"
-                            f"Cupo disponible: {cupo} estudiantes\n"
-                            f"Disponible: {'Sí' if disponible_final else 'No'}\n"
-                        )
-                        if promociones:
-                            formatted_result += f"Promociones activas: {promociones}\n"
-                        formatted_results.append(formatted_result)
-                elif tipo_predominante == "promocion" and tipo == "promocion":
-                    # Responder sobre promoción
-                    formatted_result = (
-                        f"Promoción: {payload.get('nombre', 'N/A')}\n"
-                        f"Descripción: {payload.get('descripcion', 'N/A')}\n"
-                        f"Descuento: {payload.get('descuentoPorcentaje', 'N/A')}%\n"
-                    )
-                    formatted_results.append(formatted_result)
+            # Solo se responde sobre el tipo predominante, con su formateador de la tabla
+            formatter = _RESULT_FORMATTERS.get(tipo_predominante)
+            formatted_results = [
+                formatter(result.get("payload", {}))
+                for result, tipo in zip(results, tipos)
+                if formatter and tipo == tipo_predominante
+            ]
 
             if not formatted_results:
                 return "No se encontraron resultados que coincidan con tu búsqueda."
@@ -119,55 +134,37 @@ class PromotionSearchTool(lr.ToolMessage):
             results = qdrant_service.search_similar(
                 query_embedding,  # Usar embedding real en lugar de vector cero
                 limit=10,
-                filters=filters
+                filters=filters,
+                payload_fields=_PROMOTION_PAYLOAD_FIELDS
             )
             
             if not results:
                 return "No hay promociones activas en este momento."
             
-            promotions_info = []
-            for result in results:
+            # Formatear en una sola pasada: un bloque f-string por promoción y un único join
+            blocks = []
+            for i, result in enumerate(results, 1):
                 payload = result.get("payload", {})
                 
-                # Extraer información completa de la promoción
-                promocion_info = {
-                    "descripcion": payload.get("descripcion", "Promoción sin descripción"),
-                    "descuento": payload.get("descuento", 0),
-                    "fecha_fin": payload.get("fecha_fin", "Fecha no especificada"),
-                    "total_cursos": payload.get("total_cursos", 0)
-                }
-                
                 # Extraer información detallada de cursos desde metadata
                 metadata = payload.get("metadata", {})
                 cursos_nombres = metadata.get("cursos_nombres", "") or payload.get("cursos_nombres", "")
                 cursos_detalles = metadata.get("cursos_detalles", "") or payload.get("cursos_detalles", "")
+                cursos_incluidos = cursos_nombres if cursos_nombres and cursos_nombres.strip() else "No se especifican cursos"
                 
-                if cursos_nombres and cursos_nombres.strip():
-                    promocion_info["cursos_incluidos"] = cursos_nombres
-                else:
-                    promocion_info["cursos_incluidos"] = "No se especifican cursos"
-                
+                block = (
+                    f"📍 PROMOCIÓN {i}:\n"
+                    f"   • Descripción: {payload.get('descripcion', 'Promoción sin descripción')}\n"
+                    f"   • Descuento: {payload.get('descuento', 0)}%\n"
+                    f"   • Válida hasta: {payload.get('fecha_fin', 'Fecha no especificada')}\n"
+                    f"   • Total cursos: {payload.get('total_cursos', 0)}\n"
+                    f"   • cursos incluidos: {cursos_incluidos}\n"
+                )
                 if cursos_detalles and cursos_detalles.strip():
-                    promocion_info["cursos_con_precios"] = cursos_detalles
-                else:
-                    promocion_info["cursos_con_precios"] = "Precios no disponibles"
-                
-                promotions_info.append(promocion_info)
-            
-            # Formatear respuesta de manera legible
-            formatted_response = "🎉 PROMOCIONES ACTIVAS:\n\n"
-            for i, promo in enumerate(promotions_info, 1):
-                formatted_response += f"📍 PROMOCIÓN {i}:\n"
-                formatted_response += f"   • Descripción: {promo['descripcion']}\n"
-                formatted_response += f"   • Descuento: {promo['descuento']}%\n"
-                formatted_response += f"   • Válida hasta: {promo['fecha_fin']}\n"
-                formatted_response += f"   • Total cursos: {promo['total_cursos']}\n"
-                formatted_response += f"   • cursos incluidos: {promo['cursos_incluidos']}\n"
-                if promo['cursos_con_precios'] != "Precios no disponibles":
-                    formatted_response += f"   • Detalles con precios: {promo['cursos_con_precios']}\n"
-                formatted_response += "\n"
+                    block += f"   • Detalles con precios: {cursos_detalles}\n"
+                blocks.append(block)
             
-            return formatted_response
+            return "🎉 PROMOCIONES ACTIVAS:\n\n" + "\n".join(blocks) + "\n"
                 
         except Exception as e:
             logger.error(f"Error in PromotionSearchTool: {str(e)}")
@@ -188,8 +185,7 @@ class UserHistoryTool(lr.ToolMessage):
             from app.controllers.mensaje.MensajeController import MensajeController
             
             # Obtener chats del usuario
-            chat_controller = ChatController()
-            user_chats = chat_controller.get_chats_by_usuario(self.user_id)
+            user_chats = ChatController.get_chats_by_usuario(self.user_id)
             
             if not user_chats:
                 return "Usuario sin historial previo"
@@ -1,6 +1,25 @@
 """
 Funciones utilitarias para los agentes
 """
+import logging
+import operator
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Campos donde los distintos tipos de respuesta del LLM guardan el texto
+_REPLY_FIELDS = ("content", "text", "message", "body")
+
+# Accesor resuelto por tipo de respuesta, para no repetir hasattr en cada mensaje
+_REPLY_ACCESSOR_CACHE: Dict[type, Optional[Callable[[Any], Any]]] = {}
+
+def normalize_query(text: str) -> str:
+    """Normaliza la consulta para claves de cache (minúsculas y espacios colapsados)"""
+    return " ".join(text.lower().split())
+
+def compact_prompt(prompt: str) -> str:
+    """Quita la sangría del literal: el prompt viaja en cada llamada al LLM y los espacios cuestan tokens"""
+    return "\n".join(line.strip() for line in prompt.strip().splitlines())
 
 def safe_stringify(obj):
     """Convierte cualquier objeto a string de manera segura, manejando objetos personalizados."""
@@ -16,3 +35,34 @@ def safe_stringify(obj):
         return ""
     else:
         return str(obj)
+
+def _resolve_reply_extractor(reply: Any) -> Optional[Callable[[Any], Any]]:
+    """Determina qué atributo contiene el texto para el tipo de la respuesta"""
+    for attr in _REPLY_FIELDS:
+        if hasattr(reply, attr):
+            return operator.attrgetter(attr)
+    return None
+
+def extract_reply_text(reply: Any) -> str:
+    """Extrae el texto de la respuesta del LLM sea cual sea su tipo (str, dict u objeto)."""
+    if isinstance(reply, str):
+        return reply
+    
+    value = None
+    if isinstance(reply, dict):
+        for key in _REPLY_FIELDS:
+            if key in reply:
+                value = reply[key]
+                break
+    else:
+        reply_type = type(reply)
+        if reply_type not in _REPLY_ACCESSOR_CACHE:
+            _REPLY_ACCESSOR_CACHE[reply_type] = _resolve_reply_extractor(reply)
+        extractor = _REPLY_ACCESSOR_CACHE[reply_type]
+        if extractor is not None:
+            value = extractor(reply)
+    
+    if value is None:
+        logger.warning("Respuesta LLM enviada como objeto: %s. Usando str(reply).", type(reply))
+        return str(reply)
+    return value if isinstance(value, str) else str(value)
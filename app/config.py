@@ -29,6 +29,10 @@ class Settings:
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "admin")
     DB_NAME: str = os.getenv("DB_NAME", "deeplearning_db")
     DB_SSL_CA: str = os.getenv("CA_PATH", "")
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "2.0"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
     
     # ===== CONFIGURACIÓN DE QDRANT =====
     QDRANT_HOST: str = os.getenv("QDRANT_HOST", "localhost")
@@ -40,10 +44,15 @@ class Settings:
     # ===== CONFIGURACIÓN DE OPENAI/LLM =====
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "30.0"))
     
     # ===== CONFIGURACIÓN DE EMBEDDINGS =====
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     EMBEDDING_DIMENSION: int = int(os.getenv("EMBEDDING_DIMENSION", "384"))
+    # Backend de inferencia: onnx (onnxruntime en CPU) o torch
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "onnx").lower()
+    # Grafo ONNX a cargar; por defecto la variante con pesos INT8 (cuantización dinámica)
+    EMBEDDING_ONNX_FILE: str = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
     
     # ===== CONFIGURACIÓN DE TELEGRAM =====
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -57,6 +66,16 @@ class Settings:
     PHONE_ID: str = os.getenv("PHONE_ID", "")
     VERIFY_TOKEN: str = os.getenv("VERIFY_TOKEN", "")
     WEBHOOK: str = os.getenv("WEBHOOK", "")
+    WHATSAPP_WORKERS: int = int(os.getenv("WHATSAPP_WORKERS", "4"))
+    WHATSAPP_QUEUE_MAXSIZE: int = int(os.getenv("WHATSAPP_QUEUE_MAXSIZE", "1000"))
+    # "memory" procesa en el mismo proceso; "arq" encola en Redis para un worker aparte
+    WHATSAPP_QUEUE_BACKEND: str = os.getenv("WHATSAPP_QUEUE_BACKEND", "memory").lower()
+    
+    # ===== CONFIGURACIÓN DE REDIS =====
+    REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
+    REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
+    REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
+    REDIS_PASSWORD: str = os.getenv("REDIS_PASSWORD", "")
     
     # ===== CONFIGURACIÓN DE SEGURIDAD =====
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
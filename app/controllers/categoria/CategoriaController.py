@@ -1,8 +1,12 @@
 from typing import List, Optional
 import pymysql
+from pydantic import TypeAdapter
 from app.database import get_sync_connection
 from app.models.categoria.CategoriaModel import CategoriaCreate, CategoriaUpdate, CategoriaResponse
 
+# Validación en lote de filas (núcleo Rust de pydantic v2)
+_categoria_list_adapter = TypeAdapter(List[CategoriaResponse])
+
 class CategoriaController:
     
     @staticmethod
@@ -33,7 +37,7 @@ class CategoriaController:
                 sql = "SELECT * FROM categoria ORDER BY fechaCreacion DESC"
                 cursor.execute(sql)
                 result = cursor.fetchall()
-                return [CategoriaResponse(**row) for row in result]
+                return _categoria_list_adapter.validate_python(result)
         finally:
             connection.close()
     
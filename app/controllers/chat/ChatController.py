@@ -1,18 +1,42 @@
 from typing import List, Optional, Dict
+import asyncio
+import threading
 import pymysql
+from pydantic import TypeAdapter
+from cachetools import TTLCache
 from datetime import datetime
-from app.database import get_sync_connection
+from app.database import get_sync_connection, async_cursor
 from app.models.chat.ChatModel import ChatCreate, ChatUpdate, ChatResponse
 from app.models.mensaje.MensajeModel import MensajeCreate, MensajeResponse
-from app.services.langroid_service import LangroidAgentService, HypatiaLangroidAgent
-from app.services.data_sync import DataSyncService
+from app.controllers.mensaje.MensajeController import MensajeController
+from app.services.langroid_service import LangroidAgentService, forget_active_chat
+from app.services.service_manager import service_manager
+
+# Validación en lote de filas (núcleo Rust de pydantic v2)
+_chat_list_adapter = TypeAdapter(List[ChatResponse])
+_mensaje_list_adapter = TypeAdapter(List[MensajeResponse])
+
+# IDs de chats que existen, para los chequeos 404 previos de los endpoints
+_existing_chat_ids: TTLCache = TTLCache(maxsize=10000, ttl=30)
+# IDs consultados que no existen (TTL corto; se invalidan al crear un chat)
+_missing_chat_ids: TTLCache = TTLCache(maxsize=10000, ttl=10)
+_existing_chat_ids_lock = threading.Lock()
+
+def _remember_chat(chat_id: int, exists: bool):
+    """Registra el resultado de un chequeo de existencia en la cache que corresponda"""
+    with _existing_chat_ids_lock:
+        if exists:
+            _existing_chat_ids[chat_id] = True
+            _missing_chat_ids.pop(chat_id, None)
+        else:
+            _missing_chat_ids[chat_id] = True
 
 class ChatController:
     
-    def __init__(self):
-        self.agent_service = HypatiaLangroidAgent()
-        self.langroid_service = LangroidAgentService()
-        self.data_sync_service = DataSyncService()
+    @property
+    def langroid_service(self) -> LangroidAgentService:
+        """Shared Langroid service (built once by the ServiceManager)"""
+        return service_manager.get_langroid_service()
     
     async def process_message(self, message: str, user_id: Optional[int] = None, chat_external_id: Optional[str] = None) -> Dict:
         """Process message using Langroid Multi-Agent System and persist conversation"""
@@ -32,22 +56,14 @@ class ChatController:
             if user_id and not chat_id:
                 chat_record = await self._get_or_create_chat(user_id, chat_external_id)
                 
-                # Store user message
-                await self._store_message(
-                    chat_id=chat_record['id'],
-                    tipo='usuario',
-                    contenido=message
+                # Store both messages (single INSERT) and update the chat summary concurrently
+                await asyncio.gather(
+                    MensajeController.create_mensajes_async([
+                        MensajeCreate(chatId=chat_record['id'], tipo='usuario', contenido=message),
+                        MensajeCreate(chatId=chat_record['id'], tipo='bot', contenido=bot_reply)
+                    ]),
+                    self._update_chat_summary(chat_record['id'], message)
                 )
-                
-                # Store bot response
-                await self._store_message(
-                    chat_id=chat_record['id'],
-                    tipo='bot',
-                    contenido=bot_reply
-                )
-                
-                # Update chat summary
-                await self._update_chat_summary(chat_record['id'], message)
                 chat_id = chat_record['id']
             
             return {
@@ -136,6 +152,7 @@ class ChatController:
                     
                     # Get the created chat
                     new_chat_id = cursor.lastrowid
+                    _remember_chat(new_chat_id, True)
                     cursor.execute("SELECT * FROM chat WHERE id = %s", (new_chat_id,))
                     chat_record = cursor.fetchone()
                 
@@ -143,37 +160,17 @@ class ChatController:
         finally:
             connection.close()
     
-    async def _store_message(self, chat_id: int, tipo: str, contenido: str) -> int:
-        """Store a message in the mensaje table"""
-        connection = get_sync_connection()
-        try:
-            with connection.cursor() as cursor:
-                sql = """
-                INSERT INTO mensaje (chatId, tipo, contenido, fechaCreacion) 
-                VALUES (%s, %s, %s, %s)
-                """
-                cursor.execute(sql, (chat_id, tipo, contenido, datetime.now()))
-                connection.commit()
-                return cursor.lastrowid
-        finally:
-            connection.close()
-    
     async def _update_chat_summary(self, chat_id: int, last_message: str):
-        """Update chat with last message and increment message count"""
-        connection = get_sync_connection()
-        try:
-            with connection.cursor() as cursor:
-                sql = """
-                UPDATE chat 
-                SET ultimoMensaje = %s, 
-                    totalMensajes = totalMensajes + 2, 
-                    fechaActualizcion = %s
-                WHERE id = %s
-                """
-                cursor.execute(sql, (last_message, datetime.now(), chat_id))
-                connection.commit()
-        finally:
-            connection.close()
+        """Update chat with last message and increment message count (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            sql = """
+            UPDATE chat 
+            SET ultimoMensaje = %s, 
+                totalMensajes = totalMensajes + 2, 
+                fechaActualizcion = %s
+            WHERE id = %s
+            """
+            await cursor.execute(sql, (last_message, datetime.now(), chat_id))
     
     def get_chat_history(self, chat_id: int, limit: int = 50) -> List[MensajeResponse]:
         """Get chat message history"""
@@ -188,7 +185,7 @@ class ChatController:
                 """
                 cursor.execute(sql, (chat_id, limit))
                 messages = cursor.fetchall()
-                return [MensajeResponse(**msg) for msg in messages]
+                return _mensaje_list_adapter.validate_python(messages)
         finally:
             connection.close()
     
@@ -205,7 +202,7 @@ class ChatController:
                 """
                 cursor.execute(sql, (chat_id, minutes))
                 messages = cursor.fetchall()
-                return [MensajeResponse(**msg) for msg in messages]
+                return _mensaje_list_adapter.validate_python(messages)
         finally:
             connection.close()
     
@@ -227,10 +224,28 @@ class ChatController:
                 connection.commit()
                 
                 chat_id = cursor.lastrowid
+                _remember_chat(chat_id, True)
                 return ChatController.get_chat_by_id(chat_id)
         finally:
             connection.close()
     
+    @staticmethod
+    async def create_chat_async(chat: ChatCreate) -> int:
+        """Create a new chat and return its ID (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            sql = """
+            INSERT INTO chat (usuarioId, chatId, ultimoMensaje, totalMensajes, fechaCreacion, fechaActualizcion) 
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """
+            now = datetime.now()
+            await cursor.execute(sql, (
+                chat.usuarioId, chat.chatId, chat.ultimoMensaje, 
+                chat.totalMensajes, now, now
+            ))
+            chat_id = cursor.lastrowid
+        _remember_chat(chat_id, True)
+        return chat_id
+    
     @staticmethod
     def get_all_chats() -> List[ChatResponse]:
         """Get all chats"""
@@ -240,7 +255,7 @@ class ChatController:
                 sql = "SELECT * FROM chat ORDER BY fechaCreacion DESC"
                 cursor.execute(sql)
                 result = cursor.fetchall()
-                return [ChatResponse(**row) for row in result]
+                return _chat_list_adapter.validate_python(result)
         finally:
             connection.close()
     
@@ -257,6 +272,46 @@ class ChatController:
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_chat_by_id_async(chat_id: int) -> Optional[ChatResponse]:
+        """Get chat by ID (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            await cursor.execute("SELECT * FROM chat WHERE id = %s", (chat_id,))
+            result = await cursor.fetchone()
+            return ChatResponse(**result) if result else None
+    
+    @staticmethod
+    def chat_exists(chat_id: int) -> bool:
+        """Check chat existence with short-lived caches of known and missing ids"""
+        with _existing_chat_ids_lock:
+            if chat_id in _existing_chat_ids:
+                return True
+            if chat_id in _missing_chat_ids:
+                return False
+        connection = get_sync_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM chat WHERE id = %s LIMIT 1", (chat_id,))
+                exists = cursor.fetchone() is not None
+        finally:
+            connection.close()
+        _remember_chat(chat_id, exists)
+        return exists
+    
+    @staticmethod
+    async def chat_exists_async(chat_id: int) -> bool:
+        """Check chat existence with short-lived caches of known and missing ids (async, pooled connection)"""
+        with _existing_chat_ids_lock:
+            if chat_id in _existing_chat_ids:
+                return True
+            if chat_id in _missing_chat_ids:
+                return False
+        async with async_cursor() as cursor:
+            await cursor.execute("SELECT 1 FROM chat WHERE id = %s LIMIT 1", (chat_id,))
+            exists = await cursor.fetchone() is not None
+        _remember_chat(chat_id, exists)
+        return exists
+    
     @staticmethod
     def get_chats_by_usuario(usuario_id: int) -> List[ChatResponse]:
         """Get chats by usuario"""
@@ -266,10 +321,29 @@ class ChatController:
                 sql = "SELECT * FROM chat WHERE usuarioId = %s ORDER BY fechaCreacion DESC"
                 cursor.execute(sql, (usuario_id,))
                 result = cursor.fetchall()
-                return [ChatResponse(**row) for row in result]
+                return _chat_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_chats_by_usuario_async(usuario_id: int) -> List[ChatResponse]:
+        """Get chats by usuario (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            await cursor.execute("SELECT * FROM chat WHERE usuarioId = %s ORDER BY fechaCreacion DESC", (usuario_id,))
+            result = await cursor.fetchall()
+            return _chat_list_adapter.validate_python(result)
+    
+    @staticmethod
+    async def get_latest_chat_id_async(usuario_id: int) -> Optional[int]:
+        """Get the ID of the usuario's most recent chat (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            await cursor.execute(
+                "SELECT id FROM chat WHERE usuarioId = %s ORDER BY fechaCreacion DESC LIMIT 1",
+                (usuario_id,)
+            )
+            result = await cursor.fetchone()
+            return result["id"] if result else None
+    
     @staticmethod
     def update_chat(chat_id: int, chat: ChatUpdate) -> Optional[ChatResponse]:
         """Update chat"""
@@ -314,6 +388,9 @@ class ChatController:
                 sql_chat = "DELETE FROM chat WHERE id = %s"
                 cursor.execute(sql_chat, (chat_id,))
                 connection.commit()
+                with _existing_chat_ids_lock:
+                    _existing_chat_ids.pop(chat_id, None)
+                forget_active_chat(chat_id)
                 return cursor.rowcount > 0
         finally:
             connection.close()
\ No newline at end of file
@@ -1,7 +1,74 @@
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import logging
+import uuid
 import pymysql
-from app.database import get_sync_connection
+from pydantic import TypeAdapter
+from app.database import get_sync_connection, async_cursor
 from app.models.curso.CursoModel import CursoCreate, CursoUpdate, CursoResponse
+from app.services.service_manager import service_manager
+
+logger = logging.getLogger(__name__)
+
+# Validación en lote de filas (núcleo Rust de pydantic v2)
+_curso_list_adapter = TypeAdapter(List[CursoResponse])
+
+# Listados de cursos en Redis (JSON pre-serializado), invalidados en cada escritura
+CURSOS_CACHE_PREFIX = "cursos:list:"
+CURSOS_CACHE_TTL = 300
+# Lock de relleno: los demás requests sondean la clave como mucho durante su TTL
+CURSOS_LOCK_TTL = 10
+CURSOS_LOCK_POLL_INTERVAL = 0.05
+
+async def _cached_cursos(key: str, loader: Callable[[], Awaitable[List[CursoResponse]]]) -> List[CursoResponse]:
+    """Read-through cache con lock SET NX para que un solo request rellene la clave"""
+    cache_key = CURSOS_CACHE_PREFIX + key
+    lock_key = f"{cache_key}:lock"
+    token = uuid.uuid4().hex
+    owns_lock = False
+    try:
+        cache = service_manager.get_async_redis_cache()
+        cached = await cache.get(cache_key)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CURSOS_LOCK_TTL
+        while cached is None:
+            if await cache.acquire_lock(lock_key, token, expire_seconds=CURSOS_LOCK_TTL):
+                owns_lock = True
+                # El dueño anterior pudo rellenar la clave justo antes de soltar el lock
+                cached = await cache.get(cache_key)
+                break
+            if loop.time() >= deadline:
+                break
+            # Otro request está rellenando la clave: esperar y volver a leerla
+            await asyncio.sleep(CURSOS_LOCK_POLL_INTERVAL)
+            cached = await cache.get(cache_key)
+        if cached is not None:
+            if owns_lock:
+                await cache.release_lock(lock_key, token)
+            return _curso_list_adapter.validate_json(cached)
+    except Exception as e:
+        logger.warning("Cache de cursos no disponible (%s): %s", cache_key, e)
+        return await loader()
+    
+    try:
+        cursos = await loader()
+        try:
+            await cache.set(cache_key, _curso_list_adapter.dump_json(cursos), expire_seconds=CURSOS_CACHE_TTL)
+        except Exception as e:
+            logger.warning("No se pudo guardar %s en cache: %s", cache_key, e)
+        return cursos
+    finally:
+        if owns_lock:
+            try:
+                await cache.release_lock(lock_key, token)
+            except Exception as e:
+                logger.warning("No se pudo liberar el lock %s: %s", lock_key, e)
+
+def _invalidate_cursos_cache():
+    try:
+        service_manager.get_redis_cache().delete_pattern(CURSOS_CACHE_PREFIX + "*")
+    except Exception as e:
+        logger.warning("No se pudo invalidar la cache de cursos: %s", e)
 
 class CursoController:
     
@@ -20,6 +87,7 @@ class CursoController:
                     curso.nivel.value, curso.idioma.value, curso.precio, curso.cupo
                 ))
                 connection.commit()
+                _invalidate_cursos_cache()
                 
                 curso_id = cursor.lastrowid
                 return CursoController.get_curso_by_id(curso_id)
@@ -35,10 +103,20 @@ class CursoController:
                 sql = "SELECT * FROM curso ORDER BY fechaCreacion DESC"
                 cursor.execute(sql)
                 result = cursor.fetchall()
-                return [CursoResponse(**row) for row in result]
+                return _curso_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_all_cursos_async() -> List[CursoResponse]:
+        """Get all cursos (async, pooled connection, cached)"""
+        async def load():
+            async with async_cursor() as cursor:
+                await cursor.execute("SELECT * FROM curso ORDER BY fechaCreacion DESC")
+                result = await cursor.fetchall()
+                return _curso_list_adapter.validate_python(result)
+        return await _cached_cursos("all", load)
+    
     @staticmethod
     def get_curso_by_id(curso_id: int) -> Optional[CursoResponse]:
         """Get curso by ID"""
@@ -52,6 +130,14 @@ class CursoController:
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_curso_by_id_async(curso_id: int) -> Optional[CursoResponse]:
+        """Get curso by ID (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            await cursor.execute("SELECT * FROM curso WHERE id = %s", (curso_id,))
+            result = await cursor.fetchone()
+            return CursoResponse(**result) if result else None
+    
     @staticmethod
     def get_cursos_by_categoria(categoria_id: int) -> List[CursoResponse]:
         """Get cursos by categoria"""
@@ -61,10 +147,20 @@ class CursoController:
                 sql = "SELECT * FROM curso WHERE categoriaId = %s ORDER BY fechaCreacion DESC"
                 cursor.execute(sql, (categoria_id,))
                 result = cursor.fetchall()
-                return [CursoResponse(**row) for row in result]
+                return _curso_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_cursos_by_categoria_async(categoria_id: int) -> List[CursoResponse]:
+        """Get cursos by categoria (async, pooled connection, cached)"""
+        async def load():
+            async with async_cursor() as cursor:
+                await cursor.execute("SELECT * FROM curso WHERE categoriaId = %s ORDER BY fechaCreacion DESC", (categoria_id,))
+                result = await cursor.fetchall()
+                return _curso_list_adapter.validate_python(result)
+        return await _cached_cursos(f"cat:{categoria_id}", load)
+    
     @staticmethod
     def get_cursos_by_nivel(nivel: str) -> List[CursoResponse]:
         """Get cursos by nivel"""
@@ -74,10 +170,20 @@ class CursoController:
                 sql = "SELECT * FROM curso WHERE nivel = %s ORDER BY fechaCreacion DESC"
                 cursor.execute(sql, (nivel,))
                 result = cursor.fetchall()
-                return [CursoResponse(**row) for row in result]
+                return _curso_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_cursos_by_nivel_async(nivel: str) -> List[CursoResponse]:
+        """Get cursos by nivel (async, pooled connection, cached)"""
+        async def load():
+            async with async_cursor() as cursor:
+                await cursor.execute("SELECT * FROM curso WHERE nivel = %s ORDER BY fechaCreacion DESC", (nivel,))
+                result = await cursor.fetchall()
+                return _curso_list_adapter.validate_python(result)
+        return await _cached_cursos(f"nivel:{nivel}", load)
+    
     @staticmethod
     def get_cursos_by_idioma(idioma: str) -> List[CursoResponse]:
         """Get cursos by idioma"""
@@ -87,10 +193,20 @@ class CursoController:
                 sql = "SELECT * FROM curso WHERE idioma = %s ORDER BY fechaCreacion DESC"
                 cursor.execute(sql, (idioma,))
                 result = cursor.fetchall()
-                return [CursoResponse(**row) for row in result]
+                return _curso_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_cursos_by_idioma_async(idioma: str) -> List[CursoResponse]:
+        """Get cursos by idioma (async, pooled connection, cached)"""
+        async def load():
+            async with async_cursor() as cursor:
+                await cursor.execute("SELECT * FROM curso WHERE idioma = %s ORDER BY fechaCreacion DESC", (idioma,))
+                result = await cursor.fetchall()
+                return _curso_list_adapter.validate_python(result)
+        return await _cached_cursos(f"idioma:{idioma}", load)
+    
     @staticmethod
     def update_curso(curso_id: int, curso: CursoUpdate) -> Optional[CursoResponse]:
         """Update curso"""
@@ -135,6 +251,7 @@ class CursoController:
                 sql = f"UPDATE curso SET {', '.join(update_fields)} WHERE id = %s"
                 cursor.execute(sql, values)
                 connection.commit()
+                _invalidate_cursos_cache()
                 
                 return CursoController.get_curso_by_id(curso_id)
         finally:
@@ -149,6 +266,7 @@ class CursoController:
                 sql = "DELETE FROM curso WHERE id = %s"
                 cursor.execute(sql, (curso_id,))
                 connection.commit()
+                _invalidate_cursos_cache()
                 return cursor.rowcount > 0
         finally:
             connection.close()
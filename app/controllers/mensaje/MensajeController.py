@@ -1,9 +1,13 @@
 from typing import List, Optional
 import pymysql
-from datetime import datetime
-from app.database import get_sync_connection
+from pydantic import TypeAdapter
+from datetime import datetime, timedelta
+from app.database import get_sync_connection, async_cursor
 from app.models.mensaje.MensajeModel import MensajeCreate, MensajeUpdate, MensajeResponse
 
+# Validación en lote de filas (núcleo Rust de pydantic v2)
+_mensaje_list_adapter = TypeAdapter(List[MensajeResponse])
+
 class MensajeController:
     
     @staticmethod
@@ -26,6 +30,21 @@ class MensajeController:
         finally:
             connection.close()
     
+    @staticmethod
+    async def create_mensajes_async(mensajes: List[MensajeCreate]) -> int:
+        """Create several mensajes in a single multi-row INSERT (async, pooled connection)"""
+        if not mensajes:
+            return 0
+        now = datetime.now()
+        values = ", ".join(["(%s, %s, %s, %s)"] * len(mensajes))
+        params = [v for m in mensajes for v in (m.chatId, m.tipo, m.contenido, now)]
+        async with async_cursor() as cursor:
+            await cursor.execute(
+                f"INSERT INTO mensaje (chatId, tipo, contenido, fechaEnvio) VALUES {values}",
+                params
+            )
+            return cursor.rowcount
+    
     @staticmethod
     def get_all_mensajes() -> List[MensajeResponse]:
         """Get all mensajes"""
@@ -35,10 +54,23 @@ class MensajeController:
                 sql = "SELECT * FROM mensaje ORDER BY fechaEnvio DESC"
                 cursor.execute(sql)
                 result = cursor.fetchall()
-                return [MensajeResponse(**row) for row in result]
+                return _mensaje_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_all_mensajes_paginated(limit: int = 100, offset: int = 0, before_id: Optional[int] = None) -> List[MensajeResponse]:
+        """Get a page of mensajes; before_id switches to keyset pagination (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            if before_id is not None:
+                sql = "SELECT * FROM mensaje WHERE id < %s ORDER BY id DESC LIMIT %s"
+                await cursor.execute(sql, (before_id, limit))
+            else:
+                sql = "SELECT * FROM mensaje ORDER BY fechaEnvio DESC, id DESC LIMIT %s OFFSET %s"
+                await cursor.execute(sql, (limit, offset))
+            result = await cursor.fetchall()
+            return _mensaje_list_adapter.validate_python(result)
+    
     @staticmethod
     def get_mensaje_by_id(mensaje_id: int) -> Optional[MensajeResponse]:
         """Get mensaje by ID"""
@@ -52,6 +84,14 @@ class MensajeController:
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_mensaje_by_id_async(mensaje_id: int) -> Optional[MensajeResponse]:
+        """Get mensaje by ID (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            await cursor.execute("SELECT * FROM mensaje WHERE id = %s", (mensaje_id,))
+            result = await cursor.fetchone()
+            return MensajeResponse(**result) if result else None
+    
     @staticmethod
     def get_mensajes_by_chat(chat_id: int, limit: int = 100, offset: int = 0) -> List[MensajeResponse]:
         """Get mensajes by chat with pagination"""
@@ -66,10 +106,24 @@ class MensajeController:
                 """
                 cursor.execute(sql, (chat_id, limit, offset))
                 result = cursor.fetchall()
-                return [MensajeResponse(**row) for row in result]
+                return _mensaje_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_mensajes_by_chat_async(chat_id: int, limit: int = 100, offset: int = 0) -> List[MensajeResponse]:
+        """Get mensajes by chat with pagination (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            sql = """
+            SELECT * FROM mensaje 
+            WHERE chatId = %s 
+            ORDER BY fechaEnvio ASC 
+            LIMIT %s OFFSET %s
+            """
+            await cursor.execute(sql, (chat_id, limit, offset))
+            result = await cursor.fetchall()
+            return _mensaje_list_adapter.validate_python(result)
+    
     @staticmethod
     def get_recent_mensajes_by_chat(chat_id: int, minutes: int = 60) -> List[MensajeResponse]:
         """Get recent mensajes by chat within specified minutes"""
@@ -79,15 +133,29 @@ class MensajeController:
                 sql = """
                 SELECT * FROM mensaje 
                 WHERE chatId = %s 
-                AND fechaEnvio >= DATE_SUB(NOW(), INTERVAL %s MINUTE)
+                AND fechaEnvio >= %s
                 ORDER BY fechaEnvio ASC
                 """
-                cursor.execute(sql, (chat_id, minutes))
+                cursor.execute(sql, (chat_id, datetime.now() - timedelta(minutes=minutes)))
                 result = cursor.fetchall()
-                return [MensajeResponse(**row) for row in result]
+                return _mensaje_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_recent_mensajes_by_chat_async(chat_id: int, minutes: int = 60) -> List[MensajeResponse]:
+        """Get recent mensajes by chat within specified minutes (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            sql = """
+            SELECT * FROM mensaje 
+            WHERE chatId = %s 
+            AND fechaEnvio >= %s
+            ORDER BY fechaEnvio ASC
+            """
+            await cursor.execute(sql, (chat_id, datetime.now() - timedelta(minutes=minutes)))
+            result = await cursor.fetchall()
+            return _mensaje_list_adapter.validate_python(result)
+    
     @staticmethod
     def update_mensaje(mensaje_id: int, mensaje: MensajeUpdate) -> Optional[MensajeResponse]:
         """Update mensaje content"""
@@ -1,8 +1,12 @@
 from typing import List, Optional
 import pymysql
+from pydantic import TypeAdapter
 from app.database import get_sync_connection
 from app.models.promocion.PromocionModel import PromocionCreate, PromocionUpdate, PromocionResponse
 
+# Validación en lote de filas (núcleo Rust de pydantic v2)
+_promocion_list_adapter = TypeAdapter(List[PromocionResponse])
+
 class PromocionController:
     
     @staticmethod
@@ -35,7 +39,7 @@ class PromocionController:
                 sql = "SELECT * FROM promocion ORDER BY fechaInicio DESC"
                 cursor.execute(sql)
                 result = cursor.fetchall()
-                return [PromocionResponse(**row) for row in result]
+                return _promocion_list_adapter.validate_python(result)
         finally:
             connection.close()
     
@@ -1,8 +1,12 @@
 from typing import List, Optional
 import pymysql
-from app.database import get_sync_connection
+from pydantic import TypeAdapter
+from app.database import get_sync_connection, async_cursor
 from app.models.promocionCurso.PromocionCursoModel import PromocionCursoCreate, PromocionCursoUpdate, PromocionCursoResponse
 
+# Validación en lote de filas (núcleo Rust de pydantic v2)
+_promocion_curso_list_adapter = TypeAdapter(List[PromocionCursoResponse])
+
 class PromocionCursoController:
     
     @staticmethod
@@ -32,7 +36,7 @@ class PromocionCursoController:
                 sql = "SELECT * FROM promocionCurso"
                 cursor.execute(sql)
                 result = cursor.fetchall()
-                return [PromocionCursoResponse(**row) for row in result]
+                return _promocion_curso_list_adapter.validate_python(result)
         finally:
             connection.close()
     
@@ -58,7 +62,7 @@ class PromocionCursoController:
                 sql = "SELECT * FROM promocionCurso WHERE promocionId = %s"
                 cursor.execute(sql, (promocion_id,))
                 result = cursor.fetchall()
-                return [PromocionCursoResponse(**row) for row in result]
+                return _promocion_curso_list_adapter.validate_python(result)
         finally:
             connection.close()
     
@@ -71,10 +75,18 @@ class PromocionCursoController:
                 sql = "SELECT * FROM promocionCurso WHERE cursoId = %s"
                 cursor.execute(sql, (curso_id,))
                 result = cursor.fetchall()
-                return [PromocionCursoResponse(**row) for row in result]
+                return _promocion_curso_list_adapter.validate_python(result)
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_promociones_by_curso_async(curso_id: int) -> List[PromocionCursoResponse]:
+        """Get promociones by curso (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            await cursor.execute("SELECT * FROM promocionCurso WHERE cursoId = %s", (curso_id,))
+            result = await cursor.fetchall()
+            return _promocion_curso_list_adapter.validate_python(result)
+    
     @staticmethod
     def delete_promocion_curso(promocion_curso_id: int) -> bool:
         """Delete promocion-curso association"""
@@ -1,8 +1,18 @@
 from typing import List, Optional
+import threading
 import pymysql
-from app.database import get_sync_connection
+from pydantic import TypeAdapter
+from cachetools import TTLCache
+from app.database import get_sync_connection, async_cursor
 from app.models.usuario.UsuarioModel import UsuarioCreate, UsuarioUpdate, UsuarioResponse
 
+# Validación en lote de filas (núcleo Rust de pydantic v2)
+_usuario_list_adapter = TypeAdapter(List[UsuarioResponse])
+
+# Cache username -> usuario.id para remitentes recurrentes (WhatsApp)
+_usuario_id_cache: TTLCache = TTLCache(maxsize=10000, ttl=600)
+_usuario_id_cache_lock = threading.Lock()
+
 class UsuarioController:
     
     @staticmethod
@@ -18,10 +28,27 @@ class UsuarioController:
                 cursor.execute(sql, (usuario.username, usuario.telefono))
                 connection.commit()
                 usuario_id = cursor.lastrowid
+                if usuario.username:
+                    with _usuario_id_cache_lock:
+                        _usuario_id_cache[usuario.username] = usuario_id
                 return UsuarioController.get_usuario_by_id(usuario_id)
         finally:
             connection.close()
     
+    @staticmethod
+    async def create_usuario_async(usuario: UsuarioCreate) -> int:
+        """Create a new usuario and return its ID (async, pooled connection)"""
+        async with async_cursor() as cursor:
+            await cursor.execute(
+                "INSERT INTO usuario (username, telefono) VALUES (%s, %s)",
+                (usuario.username, usuario.telefono)
+            )
+            usuario_id = cursor.lastrowid
+        if usuario.username:
+            with _usuario_id_cache_lock:
+                _usuario_id_cache[usuario.username] = usuario_id
+        return usuario_id
+    
     @staticmethod
     def get_all_usuarios() -> List[UsuarioResponse]:
         """Get all usuarios"""
@@ -31,7 +58,7 @@ class UsuarioController:
                 sql = "SELECT * FROM usuario ORDER BY fechaCreacion DESC"
                 cursor.execute(sql)
                 result = cursor.fetchall()
-                return [UsuarioResponse(**row) for row in result]
+                return _usuario_list_adapter.validate_python(result)
         finally:
             connection.close()
     
@@ -48,6 +75,28 @@ class UsuarioController:
         finally:
             connection.close()
     
+    @staticmethod
+    async def get_usuario_id_by_username_async(username: str) -> Optional[int]:
+        """Get usuario ID by username from the TTL cache, falling back to the pool (async)"""
+        with _usuario_id_cache_lock:
+            usuario_id = _usuario_id_cache.get(username)
+        if usuario_id is not None:
+            return usuario_id
+        async with async_cursor() as cursor:
+            await cursor.execute("SELECT id FROM usuario WHERE username = %s LIMIT 1", (username,))
+            result = await cursor.fetchone()
+        if not result:
+            return None
+        with _usuario_id_cache_lock:
+            _usuario_id_cache[username] = result["id"]
+        return result["id"]
+    
+    @staticmethod
+    def _invalidate_usuario_id_cache():
+        """Drop cached username -> ID mappings after a username change or delete"""
+        with _usuario_id_cache_lock:
+            _usuario_id_cache.clear()
+    
     @staticmethod
     def update_usuario(usuario_id: int, usuario: UsuarioUpdate) -> Optional[UsuarioResponse]:
         """Update usuario"""
@@ -68,6 +117,8 @@ class UsuarioController:
                 sql = f"UPDATE usuario SET {', '.join(update_fields)} WHERE id = %s"
                 cursor.execute(sql, values)
                 connection.commit()
+                if usuario.username is not None:
+                    UsuarioController._invalidate_usuario_id_cache()
                 return UsuarioController.get_usuario_by_id(usuario_id)
         finally:
             connection.close()
@@ -81,6 +132,7 @@ class UsuarioController:
                 sql = "DELETE FROM usuario WHERE id = %s"
                 cursor.execute(sql, (usuario_id,))
                 connection.commit()
+                UsuarioController._invalidate_usuario_id_cache()
                 return cursor.rowcount > 0
         finally:
             connection.close()
@@ -1,19 +1,44 @@
 import logging
 import httpx
+import orjson
 import time
 from app.config import Config
 from typing import Dict, Any, Optional
-import logging
 import asyncio
 import re
+from functools import lru_cache
+from cachetools import TTLCache
 from fastapi import HTTPException
 from app.database import get_sync_connection
 from app.controllers.chat.ChatController import ChatController
 from app.services.websocket_manager import websocket_manager
+from app.services.service_manager import service_manager
+from app.services.async_batcher import AsyncBatcher
 from app.controllers.usuario.UsuarioController import UsuarioController
+from app.models.usuario.UsuarioModel import UsuarioCreate
 
 logger = logging.getLogger(__name__)
 
+# Markdown -> formato WhatsApp, resuelto en una sola pasada sobre el texto.
+# Los encabezados (#, ##, ###) al inicio de línea no existen en WhatsApp y se eliminan,
+# y las rachas de 3+ saltos de línea del LLM se reducen a un párrafo en blanco.
+_MD_REPLACEMENTS = {"**": "*", "__": "_", "~~": "~"}
+_MD_PATTERN = re.compile(
+    "|".join(re.escape(token) for token in _MD_REPLACEMENTS) + r"|(?m:^#{1,6}[ \t]+)|\n{3,}"
+)
+
+def _md_replacement(match: re.Match) -> str:
+    token = match.group(0)
+    if token[0] == "\n":
+        return "\n\n"
+    return _MD_REPLACEMENTS.get(token, "")
+
+# Timeout por envío a la Graph API (el del cliente compartido es más corto)
+_SEND_TIMEOUT = 30.0
+
+# IDs de mensajes ya procesados, para idempotencia ante reintentos del webhook
+_SEEN_MESSAGE_IDS: TTLCache = TTLCache(maxsize=50000, ttl=600)
+
 class WhatsAppController:
     """
     Controlador para manejar la lógica de interacción con WhatsApp y el LLM
@@ -24,6 +49,14 @@ class WhatsAppController:
         self.access_token = Config.ACCESS_TOKEN
         self.phone_id = Config.PHONE_ID
         self.webhook_url = Config.WEBHOOK
+        # URL y headers de la Graph API, constantes para toda la vida del controlador
+        self._send_url = f"https://graph.facebook.com/v23.0/{self.phone_id}/messages"
+        self._send_headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json"
+        }
+        # Envíos cercanos en el tiempo salen juntos, multiplexados sobre la conexión HTTP/2
+        self._send_batcher = AsyncBatcher(self._post_batch, max_size=32, max_wait=0.05)
         self.chat_controller = ChatController()
         self.usuario_controller = UsuarioController()
 
@@ -31,53 +64,51 @@ class WhatsAppController:
     async def process_message(self, webhook_data: dict) -> None:
         try:
             # Extraer el mensaje y datos del usuario desde el webhook de WhatsApp
-            entry = webhook_data.get("entry", [{}])[0]
-            changes = entry.get("changes", [{}])[0]
-            value = changes.get("value", {})
-            messages = value.get("messages", [])
-            contacts = value.get("contacts", [{}])
+            try:
+                value = webhook_data["entry"][0]["changes"][0]["value"]
+                message = value["messages"][0]
+            except (KeyError, IndexError, TypeError):
+                logger.info("Evento recibido sin mensajes de usuario. Ignorando.")
+                return
+            contacts = value.get("contacts")
 
             # Validar timestamp del mensaje para evitar procesar mensajes antiguos
             MAX_AGE_SECONDS = 300  # 5 minutos
-            if messages and isinstance(messages, list) and len(messages) > 0:
-                message_ts = messages[0].get("timestamp")
-                if message_ts:
-                    try:
-                        # WhatsApp timestamp is usually in seconds (UNIX epoch)
-                        msg_time = int(message_ts)
-                        now = int(time.time())
-                        age = now - msg_time
-                        if age > MAX_AGE_SECONDS:
-                            logger.info(f"Mensaje ignorado por antigüedad ({age}s > {MAX_AGE_SECONDS}s): {messages[0]}")
-                            return
-                    except Exception as e:
-                        logger.error(f"Error validando timestamp del mensaje: {e}")
-                        # Si hay error, procesar normalmente
-            # Solo procesar si hay mensajes y el tipo es 'text'
-            if not messages or not isinstance(messages, list) or len(messages) == 0:
-                logger.info("Evento recibido sin mensajes de usuario. Ignorando.")
-                return
-            message = messages[0]
+            message_ts = message.get("timestamp")
+            if message_ts:
+                try:
+                    # WhatsApp timestamp is usually in seconds (UNIX epoch)
+                    age = int(time.time()) - int(message_ts)
+                    if age > MAX_AGE_SECONDS:
+                        logger.info("Mensaje %s ignorado por antigüedad (%ss > %ss)", message.get("id"), age, MAX_AGE_SECONDS)
+                        return
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Error validando timestamp del mensaje: {e}")
+                    # Si hay error, procesar normalmente
+            # Descartar reentregas del mismo mensaje (WhatsApp reintenta ante errores)
+            message_id = message.get("id")
+            if message_id:
+                if message_id in _SEEN_MESSAGE_IDS:
+                    logger.info("Mensaje duplicado ignorado: %s", message_id)
+                    return
+                _SEEN_MESSAGE_IDS[message_id] = True
             if message.get("type") != "text":
-                logger.info(f"Evento recibido de tipo '{message.get('type')}'. Solo se procesan mensajes de texto.")
+                logger.info("Evento recibido de tipo '%s'. Solo se procesan mensajes de texto.", message.get("type"))
                 return
             text = message.get("text", {}).get("body")
             wa_user = message.get("from")
             wa_id = wa_user
-            # Extraer el message_id para respuesta encadenada
-            message_id = message.get("id")
-            self._last_message_id = message_id  # Almacenar temporalmente en la instancia
             # Ignorar mensajes enviados por el propio bot para evitar bucles
             if wa_id == self.phone_id:
-                logger.info(f"Mensaje recibido desde el propio bot (wa_id={wa_id}). Ignorando para evitar bucle.")
+                logger.info("Mensaje recibido desde el propio bot (wa_id=%s). Ignorando para evitar bucle.", wa_id)
                 return
             profile_name = None
-            if contacts and isinstance(contacts, list) and contacts[0].get("profile"):
+            if contacts and contacts[0].get("profile"):
                 profile_name = contacts[0]["profile"].get("name")
             if not text:
                 logger.info("Mensaje de tipo texto recibido sin contenido. Ignorando.")
                 return
-            logger.info(f"Procesando mensaje de WhatsApp {wa_id}: {text}")
+            logger.info("Procesando mensaje de WhatsApp %s: %s", wa_id, text)
             usuario_id = await self._get_or_create_usuario(wa_id, profile_name)
             response_result = await self.chat_controller.process_message(
                 message=text,
@@ -85,44 +116,27 @@ class WhatsAppController:
                 chat_external_id=f"whatsapp_{wa_id}"
             )
             if response_result["status"] == "success":
-                reply = response_result["data"]["reply"]
-                # Si es string, usar directamente
-                if isinstance(reply, str):
-                    response_text = reply
-                else:
-                    # Intentar extraer el texto real de los atributos más comunes
-                    response_text = None
-                    for attr in ["content", "text", "message", "body"]:
-                        if hasattr(reply, attr):
-                            response_text = getattr(reply, attr)
-                            break
-                    # Si no se encontró, intentar convertir a dict y buscar claves
-                    if response_text is None:
-                        try:
-                            reply_dict = reply if isinstance(reply, dict) else reply.__dict__
-                            for key in ["content", "text", "message", "body"]:
-                                if key in reply_dict:
-                                    response_text = reply_dict[key]
-                                    break
-                        except Exception:
-                            pass
-                    # Si sigue sin encontrarse, usar str pero loggear advertencia
-                    if response_text is None:
-                        logger.warning(f"Respuesta LLM enviada como objeto: {type(reply)}. Usando str(reply).")
-                        response_text = str(reply)
+                response_text = response_result["data"]["reply"]
             else:
                 response_text = "🤖 Disculpa, tuve un problema procesando tu mensaje. ¿Podrías intentar de nuevo?"
-            await self._send_whatsapp_message(wa_id, response_text)
-            
-            # Enviar UNA SOLA notificación WebSocket sobre la conversación actualizada
-            await websocket_manager.notify_new_message(
-                chat_id=f"whatsapp_{wa_id}",
-                user_id=usuario_id,
-                message=response_text[:50] + "..." if len(response_text) > 50 else response_text,
-                is_user=False
+            preview = response_text if len(response_text) <= 50 else response_text[:50] + "..."
+            # Envío a WhatsApp y notificación WebSocket no dependen entre sí: se lanzan juntos
+            send_result, notify_result = await asyncio.gather(
+                self._send_whatsapp_message(wa_id, response_text, reply_to=message_id),
+                websocket_manager.notify_new_message(
+                    chat_id=f"whatsapp_{wa_id}",
+                    user_id=usuario_id,
+                    message=preview,
+                    is_user=False
+                ),
+                return_exceptions=True
             )
+            if isinstance(send_result, Exception):
+                logger.error(f"Error enviando respuesta a WhatsApp {wa_id}: {str(send_result)}")
+            if isinstance(notify_result, Exception):
+                logger.error(f"Error notificando por WebSocket el chat whatsapp_{wa_id}: {str(notify_result)}")
             
-            logger.info(f"Mensaje procesado exitosamente para usuario {wa_id}")
+            logger.info("Mensaje procesado exitosamente para usuario %s", wa_id)
         except Exception as e:
             logger.error(f"Error procesando mensaje: {str(e)}")
             if 'wa_id' in locals():
@@ -130,48 +144,42 @@ class WhatsAppController:
 
     async def _get_or_create_usuario(self, wa_id: str, profile_name: str = None) -> int:
         try:
-            usuarios = self.usuario_controller.get_all_usuarios()
-            existing_user = None
-            for usuario in usuarios:
-                if usuario.username == (profile_name if profile_name else wa_id):
-                    existing_user = usuario
-                    break
-            if existing_user:
-                return existing_user.id
-            from app.models.usuario.UsuarioModel import UsuarioCreate
+            username = profile_name if profile_name else wa_id
+            existing_user_id = await self.usuario_controller.get_usuario_id_by_username_async(username)
+            if existing_user_id:
+                return existing_user_id
             new_user = UsuarioCreate(
-                username=profile_name if profile_name else wa_id,
+                username=username,
                 telefono=wa_id
             )
-            created_user = self.usuario_controller.create_usuario(new_user)
-            logger.info(f"Usuario creado: {created_user.username} (ID: {created_user.id})")
-            return created_user.id
+            created_user_id = await self.usuario_controller.create_usuario_async(new_user)
+            logger.info("Usuario creado: %s (ID: %s)", username, created_user_id)
+            return created_user_id
         except Exception as e:
             logger.error(f"Error obteniendo/creando usuario: {str(e)}")
             raise
 
-    async def _send_whatsapp_message(self, wa_id: str, text: str) -> bool:
+    @staticmethod
+    def _fix_markdown_format(text: str) -> str:
+        """Convierte el Markdown del LLM (**negrita**, ~~tachado~~) al formato de WhatsApp"""
+        return _MD_PATTERN.sub(_md_replacement, text).strip()
+
+    async def _send_whatsapp_message(self, wa_id: str, text: str, reply_to: Optional[str] = None) -> bool:
         try:
-            url = f"https://graph.facebook.com/v23.0/{self.phone_id}/messages"
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            }
             payload = {
                 "messaging_product": "whatsapp",
                 "to": wa_id,
                 "type": "text",
-                "text": {"body": text}
+                "text": {"body": self._fix_markdown_format(text)}
             }
-            # Si hay un message_id almacenado, incluirlo en el contexto para respuesta encadenada
-            if hasattr(self, '_last_message_id') and self._last_message_id:
-                payload["context"] = {"message_id": self._last_message_id}
-                # Limpiar el message_id después de usarlo
-                self._last_message_id = None
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, headers=headers, timeout=30.0)
-                response.raise_for_status()
-            logger.info(f"Mensaje enviado exitosamente a WhatsApp {wa_id}")
+            # Si hay un message_id, incluirlo en el contexto para respuesta encadenada
+            if reply_to:
+                payload["context"] = {"message_id": reply_to}
+            response = await self._send_batcher.submit(payload)
+            if isinstance(response, Exception):
+                raise response
+            response.raise_for_status()
+            logger.info("Mensaje enviado exitosamente a WhatsApp %s", wa_id)
             return True
         except httpx.TimeoutException:
             logger.error(f"Timeout enviando mensaje a WhatsApp {wa_id}")
@@ -180,9 +188,24 @@ class WhatsAppController:
             logger.error(f"Error enviando mensaje a WhatsApp: {str(e)}")
             return False
 
+    async def _post_batch(self, payloads: list) -> list:
+        """Envía un lote de mensajes en paralelo; cada resultado es la respuesta o la excepción"""
+        client = service_manager.get_http_client()
+        return await asyncio.gather(
+            *(client.post(self._send_url, content=orjson.dumps(payload), headers=self._send_headers,
+                          timeout=_SEND_TIMEOUT)
+              for payload in payloads),
+            return_exceptions=True
+        )
+
     async def _send_error_message(self, wa_id: str) -> None:
         error_message = (
             "🚫 Ups! Algo salió mal. Nuestro equipo técnico ya está trabajando en solucionarlo. "
             "Por favor, intenta de nuevo en unos minutos."
         )
         await self._send_whatsapp_message(wa_id, error_message)
+
+@lru_cache(maxsize=1)
+def get_whatsapp_controller() -> WhatsAppController:
+    """Instancia única del controlador, compartida por rutas, cola y worker"""
+    return WhatsAppController()
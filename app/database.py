@@ -1,7 +1,14 @@
+import asyncio
+import ssl
 import pymysql
 import aiomysql
+from contextlib import asynccontextmanager
+from typing import Optional
 from app.config import settings
 
+_async_pool: Optional[aiomysql.Pool] = None
+_async_pool_lock = asyncio.Lock()
+
 def get_sync_connection():
     """Get synchronous database connection"""
     connection_params = {
@@ -24,14 +31,53 @@ def get_sync_connection():
     
     return pymysql.connect(**connection_params)
 
-async def get_async_connection():
-    """Get asynchronous database connection"""
-    return await aiomysql.connect(
-        host=settings.DB_HOST,
-        port=settings.DB_PORT,
-        user=settings.DB_USER,
-        password=settings.DB_PASSWORD,
-        db=settings.DB_NAME,
-        charset='utf8mb4',
-        cursorclass=aiomysql.DictCursor
-    )
\ No newline at end of file
+async def get_async_pool() -> aiomysql.Pool:
+    """Get the shared aiomysql connection pool (created on first use)"""
+    global _async_pool
+    if _async_pool is None:
+        async with _async_pool_lock:
+            if _async_pool is None:
+                _async_pool = await aiomysql.create_pool(
+                    host=settings.DB_HOST,
+                    port=settings.DB_PORT,
+                    user=settings.DB_USER,
+                    password=settings.DB_PASSWORD,
+                    db=settings.DB_NAME,
+                    charset='utf8mb4',
+                    cursorclass=aiomysql.DictCursor,
+                    autocommit=True,
+                    minsize=settings.DB_POOL_MIN_SIZE,
+                    maxsize=settings.DB_POOL_MAX_SIZE,
+                    pool_recycle=settings.DB_POOL_RECYCLE,
+                    ssl=ssl.create_default_context(cafile=settings.DB_SSL_CA) if settings.DB_SSL_CA else None
+                )
+    return _async_pool
+
+async def init_async_pool():
+    """Create the pool at startup so the first requests find open connections"""
+    pool = await get_async_pool()
+    async with async_cursor() as cursor:
+        await cursor.execute("SELECT 1")
+    return pool
+
+@asynccontextmanager
+async def async_cursor():
+    """Borrow a pooled connection (pinged before use) and yield a DictCursor on it"""
+    pool = await get_async_pool()
+    # Bounded wait so a saturated pool fails fast instead of hanging the request
+    connection = await asyncio.wait_for(pool.acquire(), timeout=settings.DB_POOL_TIMEOUT)
+    try:
+        # Pre-ping: reconnects transparently if MySQL dropped the idle connection
+        await connection.ping(reconnect=True)
+        async with connection.cursor() as cursor:
+            yield cursor
+    finally:
+        pool.release(connection)
+
+async def close_async_pool():
+    """Close the shared aiomysql connection pool"""
+    global _async_pool
+    if _async_pool is not None:
+        _async_pool.close()
+        await _async_pool.wait_closed()
+        _async_pool = None
\ No newline at end of file
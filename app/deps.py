@@ -0,0 +1,9 @@
+"""
+Dependencias compartidas para inyectar en las rutas con FastAPI Depends
+"""
+from app.services.langroid_service import LangroidAgentService
+from app.services.service_manager import service_manager
+
+def get_langroid() -> LangroidAgentService:
+    """Servicio Langroid único del proceso (lo construye y conserva el ServiceManager)"""
+    return service_manager.get_langroid_service()
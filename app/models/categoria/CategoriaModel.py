@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
 
@@ -18,5 +18,4 @@ class CategoriaResponse(CategoriaBase):
     fechaCreacion: datetime
     fechaActualizacion: datetime
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
 
@@ -20,5 +20,4 @@ class ChatResponse(ChatBase):
     fechaCreacion: datetime
     fechaActualizcion: datetime  # Note: keeping the typo from the DDL
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional
 from datetime import datetime
 from decimal import Decimal
@@ -35,8 +35,9 @@ class CursoUpdate(BaseModel):
 
 class CursoResponse(CursoBase):
     id: int
+    # Solo lectura: float evita el costo de Decimal al serializar listados
+    precio: float = Field(..., ge=0)
     fechaCreacion: datetime
     fechaActualizacion: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
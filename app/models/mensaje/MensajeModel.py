@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Literal
 from datetime import datetime
 
@@ -17,5 +17,4 @@ class MensajeResponse(MensajeBase):
     id: int
     fechaEnvio: datetime
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional
 from datetime import date
 
@@ -20,5 +20,4 @@ class PromocionUpdate(BaseModel):
 class PromocionResponse(PromocionBase):
     id: int
     
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
\ No newline at end of file
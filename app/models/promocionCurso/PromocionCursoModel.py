@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
 class PromocionCursoBase(BaseModel):
@@ -15,5 +15,4 @@ class PromocionCursoUpdate(BaseModel):
 class PromocionCursoResponse(PromocionCursoBase):
     id: int
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
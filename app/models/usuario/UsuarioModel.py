@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
 
@@ -22,5 +22,4 @@ class UsuarioResponse(UsuarioBase):
     fechaCreacion: datetime
     fechaActualizacion: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
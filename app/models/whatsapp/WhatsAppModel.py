@@ -0,0 +1,31 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Dict, Any
+
+class WhatsAppValue(BaseModel):
+    """Contenido de un cambio del webhook (mensajes, contactos, estados)"""
+    messaging_product: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    contacts: List[Dict[str, Any]] = []
+    messages: List[Dict[str, Any]] = []
+    statuses: List[Dict[str, Any]] = []
+    
+    model_config = ConfigDict(extra='ignore')
+
+class WhatsAppChange(BaseModel):
+    field: Optional[str] = None
+    value: WhatsAppValue
+    
+    model_config = ConfigDict(extra='ignore')
+
+class WhatsAppEntry(BaseModel):
+    id: Optional[str] = None
+    changes: List[WhatsAppChange] = []
+    
+    model_config = ConfigDict(extra='ignore')
+
+class WhatsAppWebhookPayload(BaseModel):
+    """Payload del webhook de WhatsApp Cloud API; los campos nuevos de Meta se ignoran"""
+    object: str
+    entry: List[WhatsAppEntry] = []
+    
+    model_config = ConfigDict(extra='ignore')
@@ -1,5 +1,6 @@
 
 from fastapi import APIRouter, HTTPException, status, Query
+import asyncio
 from typing import List, Optional
 from app.controllers.chat.ChatController import ChatController
 from app.controllers.mensaje.MensajeController import MensajeController
@@ -50,22 +51,24 @@ async def process_message(request: ChatMessageRequest):
         )
 
 @router.get("/{chat_id}/history", response_model=List[MensajeResponse])
-def get_chat_history(
+async def get_chat_history(
     chat_id: int,
     limit: int = Query(50, ge=1, le=500, description="Number of messages to retrieve"),
     offset: int = Query(0, ge=0, description="Number of messages to skip")
 ):
     """Get chat message history with pagination"""
     try:
-        # Verify chat exists
-        chat = ChatController.get_chat_by_id(chat_id)
-        if not chat:
+        # Verify chat exists while the page is fetched on a second pooled connection
+        chat_exists, messages = await asyncio.gather(
+            ChatController.chat_exists_async(chat_id),
+            MensajeController.get_mensajes_by_chat_async(chat_id, limit, offset)
+        )
+        if not chat_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Chat not found"
             )
         
-        messages = MensajeController.get_mensajes_by_chat(chat_id, limit, offset)
         return messages
         
     except HTTPException:
@@ -77,21 +80,23 @@ def get_chat_history(
         )
 
 @router.get("/{chat_id}/recent", response_model=List[MensajeResponse])
-def get_recent_messages(
+async def get_recent_messages(
     chat_id: int,
     minutes: int = Query(60, ge=1, le=1440, description="Minutes back to retrieve messages")
 ):
     """Get recent messages from a chat within specified time frame"""
     try:
-        # Verify chat exists
-        chat = ChatController.get_chat_by_id(chat_id)
-        if not chat:
+        # Verify chat exists while the messages are fetched on a second pooled connection
+        chat_exists, messages = await asyncio.gather(
+            ChatController.chat_exists_async(chat_id),
+            MensajeController.get_recent_mensajes_by_chat_async(chat_id, minutes)
+        )
+        if not chat_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Chat not found"
             )
         
-        messages = MensajeController.get_recent_mensajes_by_chat(chat_id, minutes)
         return messages
         
     except HTTPException:
@@ -103,9 +108,9 @@ def get_recent_messages(
         )
 
 @router.get("/usuario/{usuario_id}", response_model=List[ChatResponse])
-def get_user_chats(usuario_id: int):
+async def get_user_chats(usuario_id: int):
     """Get all chats for a specific user"""
-    return ChatController.get_chats_by_usuario(usuario_id)
+    return await ChatController.get_chats_by_usuario_async(usuario_id)
 
 # ========== CHAT CRUD ENDPOINTS ==========
 
@@ -118,9 +123,9 @@ def create_chat(chat: ChatCreate):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.get("/{chat_id}", response_model=ChatResponse)
-def get_chat(chat_id: int):
+async def get_chat(chat_id: int):
     """Get chat by ID"""
-    chat = ChatController.get_chat_by_id(chat_id)
+    chat = await ChatController.get_chat_by_id_async(chat_id)
     if not chat:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found")
     return chat
@@ -154,8 +159,7 @@ def get_chat_summary(
     """Get chat conversation summary (Admin only)"""
     try:
         # Verify chat exists
-        chat = ChatController.get_chat_by_id(chat_id)
-        if not chat:
+        if not ChatController.chat_exists(chat_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Chat not found"
@@ -177,8 +181,7 @@ def get_chat_statistics(chat_id: int):
     """Get chat statistics (Admin only)"""
     try:
         # Verify chat exists
-        chat = ChatController.get_chat_by_id(chat_id)
-        if not chat:
+        if not ChatController.chat_exists(chat_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Chat not found"
@@ -206,9 +209,9 @@ def create_message(mensaje: MensajeCreate):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @messages_router.get("/{mensaje_id}", response_model=MensajeResponse)
-def get_message(mensaje_id: int):
+async def get_message(mensaje_id: int):
     """Get message by ID"""
-    mensaje = MensajeController.get_mensaje_by_id(mensaje_id)
+    mensaje = await MensajeController.get_mensaje_by_id_async(mensaje_id)
     if not mensaje:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
     return mensaje
@@ -228,9 +231,10 @@ def delete_message(mensaje_id: int):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
 
 @messages_router.get("/", response_model=List[MensajeResponse])
-def get_all_messages(
+async def get_all_messages(
     limit: int = Query(100, ge=1, le=1000, description="Number of messages to retrieve"),
-    offset: int = Query(0, ge=0, description="Number of messages to skip")
+    offset: int = Query(0, ge=0, description="Number of messages to skip"),
+    before_id: Optional[int] = Query(None, ge=1, description="Return messages with id lower than this (keyset pagination, ignores offset)")
 ):
     """Get all messages with pagination (Admin use)"""
-    return MensajeController.get_all_mensajes()[offset:offset+limit]
+    return await MensajeController.get_all_mensajes_paginated(limit, offset, before_id)
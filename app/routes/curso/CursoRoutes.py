@@ -14,32 +14,32 @@ def create_curso(curso: CursoCreate):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.get("/", response_model=List[CursoResponse])
-def get_all_cursos():
+async def get_all_cursos():
     """Get all cursos"""
-    return CursoController.get_all_cursos()
+    return await CursoController.get_all_cursos_async()
 
 @router.get("/{curso_id}", response_model=CursoResponse)
-def get_curso(curso_id: int):
+async def get_curso(curso_id: int):
     """Get curso by ID"""
-    curso = CursoController.get_curso_by_id(curso_id)
+    curso = await CursoController.get_curso_by_id_async(curso_id)
     if not curso:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Curso not found")
     return curso
 
 @router.get("/categoria/{categoria_id}", response_model=List[CursoResponse])
-def get_cursos_by_categoria(categoria_id: int):
+async def get_cursos_by_categoria(categoria_id: int):
     """Get cursos by categoria"""
-    return CursoController.get_cursos_by_categoria(categoria_id)
+    return await CursoController.get_cursos_by_categoria_async(categoria_id)
 
 @router.get("/nivel/{nivel}", response_model=List[CursoResponse])
-def get_cursos_by_nivel(nivel: str):
+async def get_cursos_by_nivel(nivel: str):
     """Get cursos by nivel"""
-    return CursoController.get_cursos_by_nivel(nivel)
+    return await CursoController.get_cursos_by_nivel_async(nivel)
 
 @router.get("/idioma/{idioma}", response_model=List[CursoResponse])
-def get_cursos_by_idioma(idioma: str):
+async def get_cursos_by_idioma(idioma: str):
     """Get cursos by idioma"""
-    return CursoController.get_cursos_by_idioma(idioma)
+    return await CursoController.get_cursos_by_idioma_async(idioma)
 
 @router.put("/{curso_id}", response_model=CursoResponse)
 def update_curso(curso_id: int, curso: CursoUpdate):
@@ -32,9 +32,9 @@ def get_cursos_by_promocion(promocion_id: int):
     return PromocionCursoController.get_cursos_by_promocion(promocion_id)
 
 @router.get("/curso/{curso_id}", response_model=List[PromocionCursoResponse])
-def get_promociones_by_curso(curso_id: int):
+async def get_promociones_by_curso(curso_id: int):
     """Get promociones by curso"""
-    return PromocionCursoController.get_promociones_by_curso(curso_id)
+    return await PromocionCursoController.get_promociones_by_curso_async(curso_id)
 
 @router.delete("/{promocion_curso_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_promocion_curso(promocion_curso_id: int):
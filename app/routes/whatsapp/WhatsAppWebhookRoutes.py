@@ -1,36 +1,63 @@
 from fastapi import APIRouter, Request, HTTPException
+import hashlib
+import hmac
 import logging
+from pydantic import ValidationError
 from app.config import Config
+from app.models.whatsapp.WhatsAppModel import WhatsAppWebhookPayload
 
 logger = logging.getLogger(__name__)
 
 whatsapp_router = APIRouter(prefix="/webhook", tags=["whatsapp"])
 
+# Token de verificación pre-codificado para la comparación en tiempo constante
+_VERIFY_TOKEN = Config.VERIFY_TOKEN.encode()
+# Secreto de la app para validar X-Hub-Signature-256 (si no está configurado no se valida)
+_APP_SECRET = Config.APP_SECRET.encode()
+
 
 @whatsapp_router.get("")
 async def verify_webhook(request: Request):
-    params = request.query_params
-    mode = params.get("hub.mode")
-    challenge = params.get("hub.challenge")
-    verify_token = params.get("hub.verify_token")
-    if mode == "subscribe" and verify_token == Config.VERIFY_TOKEN:
-        logger.info(f"Webhook verificado correctamente: challenge={challenge}")
+    qp = request.query_params
+    mode, challenge, verify_token = qp.get("hub.mode"), qp.get("hub.challenge"), qp.get("hub.verify_token")
+    if mode == "subscribe" and verify_token and _VERIFY_TOKEN and hmac.compare_digest(verify_token.encode(), _VERIFY_TOKEN):
+        logger.info("Webhook verificado correctamente: challenge=%s", challenge)
         return int(challenge)
-    logger.warning(f"Intento de verificación fallido: mode={mode}, token={verify_token}")
+    logger.warning("Intento de verificación fallido: mode=%s", mode)
     raise HTTPException(status_code=403, detail="Verificación de webhook fallida")
 
 
-# Endpoint POST para recibir mensajes de WhatsApp y procesarlos
-from app.controllers.whatsapp.WhatsAppController import WhatsAppController
-whatsapp_controller = WhatsAppController()
+# Endpoint POST para recibir mensajes de WhatsApp y encolarlos
+from app.services.webhook_queue import webhook_queue
+from app.workers.whatsapp_worker import get_message_id
 
 @whatsapp_router.post("")
 async def receive_whatsapp_webhook(request: Request):
-    body = await request.json()
-    logger.info(f"Webhook POST recibido: {body}")
+    # Primero la firma sobre los bytes crudos: un request falso no paga el parseo
+    # ni recibe el detalle de validación del esquema
+    raw = await request.body()
+    if _APP_SECRET:
+        expected = "sha256=" + hmac.new(_APP_SECRET, raw, hashlib.sha256).hexdigest()
+        signature = request.headers.get("x-hub-signature-256", "")
+        if not hmac.compare_digest(signature.encode(), expected.encode()):
+            logger.warning("Webhook POST con firma inválida")
+            raise HTTPException(status_code=403, detail="Firma de webhook inválida")
     try:
-        await whatsapp_controller.process_message(body)
+        # Parseo y validación en un solo paso con pydantic-core
+        payload = WhatsAppWebhookPayload.model_validate_json(raw)
+    except ValidationError:
+        logger.warning("Webhook POST con payload inválido: bytes=%d", len(raw))
+        raise HTTPException(status_code=400, detail="Payload de webhook inválido")
+    body = payload.model_dump()
+    msg_id = get_message_id(body)
+    # Solo el ID y el tamaño: nunca el payload completo
+    logger.info("Webhook POST recibido: msg_id=%s bytes=%d", msg_id, len(raw))
+    # Responder de inmediato; el procesamiento ocurre en el pool de workers
+    arq_pool = request.app.state.arq
+    if arq_pool is not None:
+        # El ID del mensaje como job id hace que los reintentos de Meta no generen trabajos duplicados
+        await arq_pool.enqueue_job("process_whatsapp", body, _job_id=msg_id)
         return {"status": "ok"}
-    except Exception as e:
-        logger.error(f"Error procesando webhook: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error interno del servidor")
+    if not webhook_queue.enqueue(body):
+        raise HTTPException(status_code=503, detail="Cola de webhooks llena")
+    return {"status": "ok"}
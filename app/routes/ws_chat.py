@@ -1,86 +1,118 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from fastapi.responses import HTMLResponse
 import logging
+import time
+import orjson
 from datetime import datetime
 from app.services.langroid_service import LangroidAgentService
+from app.deps import get_langroid
 from app.services.websocket_manager import websocket_manager
 
 logger = logging.getLogger(__name__)
 ws_router = APIRouter()
 
-# Instancia global del servicio de agentes
-langroid_service = LangroidAgentService()
+# Dict vacío compartido para los .get() encadenados (no se muta)
+_EMPTY: dict = {}
+
+# Envoltorio JSON fijo de los frames de streaming; solo se serializa el token
+_CHUNK_PREFIX = '{"type":"message_chunk","data":{"delta":'
+_CHUNK_SUFFIX = '}}'
+
+# Prefijo del keep-alive más frecuente, para frames de texto y binarios
+_PING_PREFIX = '{"type":"ping"'
+_PING_PREFIX_BYTES = _PING_PREFIX.encode()
+
+# Timestamp ISO reutilizado entre frames cercanos (resolución de 50 ms)
+_ts_cache = {"t": 0.0, "s": ""}
+
+def _now_iso() -> str:
+    t = time.time()
+    if t - _ts_cache["t"] > 0.05:
+        _ts_cache["t"] = t
+        _ts_cache["s"] = datetime.fromtimestamp(t).isoformat()
+    return _ts_cache["s"]
 
 @ws_router.websocket("/ws/chat")
-async def websocket_chat(websocket: WebSocket):
+async def websocket_chat(websocket: WebSocket, langroid_service: LangroidAgentService = Depends(get_langroid)):
     await websocket_manager.connect(websocket)
     logger.info("WebSocket conectado")
-    import json
     try:
         while True:
-            try:
-                data = await websocket.receive_text()
-            except WebSocketDisconnect:
+            # Frames de texto llegan como str; los binarios pasan como bytes directo a orjson (sin decodificar)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
                 logger.info("WebSocket desconectado por el cliente.")
                 break
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes") or b""
             
-            logger.info(f"Mensaje recibido por WebSocket: {data}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Mensaje recibido por WebSocket: %s", data)
             
             # Validar que el mensaje no esté vacío ni sea solo espacios
             if not data or not data.strip():
                 continue
                 
+            # Atajo para el keep-alive más frecuente, sin parsear
+            if data.startswith(_PING_PREFIX if isinstance(data, str) else _PING_PREFIX_BYTES):
+                continue
+                
             # Intentar parsear como JSON para filtrar mensajes tipo 'ping'
             try:
-                msg_obj = json.loads(data)
+                msg_obj = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                msg_obj = None
+                
+            if isinstance(msg_obj, dict):
                 msg_type = msg_obj.get("type")
+                msg_data = msg_obj.get("data", _EMPTY)
+                if not isinstance(msg_data, dict):
+                    msg_data = _EMPTY
                 
                 # Ignorar mensajes tipo 'ping' y otros que no sean de usuario
                 if msg_type == "ping":
                     logger.info("🚫 Ignorando mensaje tipo 'ping'")
                     continue
+                
+                # Suscripción a notificaciones de un chat concreto
+                if msg_type in ("subscribe", "unsubscribe"):
+                    chat_id = msg_data.get("chatId")
+                    if chat_id:
+                        if msg_type == "subscribe":
+                            websocket_manager.subscribe(websocket, str(chat_id))
+                        else:
+                            websocket_manager.unsubscribe(websocket, str(chat_id))
+                    continue
                     
                 if msg_type != "message":
-                    logger.info(f"🚫 Ignorando mensaje tipo '{msg_type}'")
+                    logger.info("🚫 Ignorando mensaje tipo '%s'", msg_type)
                     continue
                     
-                user_message = msg_obj.get("data", {}).get("message", "")
-                if not user_message.strip():
+                user_message = msg_data.get("message", "")
+                if not isinstance(user_message, str) or not user_message.strip():
                     logger.info("🚫 Ignorando mensaje vacío dentro de JSON")
                     continue
                     
                 # Procesar solo el mensaje del usuario
                 process_input = user_message
-                logger.info(f"✅ Procesando mensaje de usuario: {process_input}")
+                logger.info("✅ Procesando mensaje de usuario: %d caracteres", len(process_input))
                 
-            except Exception:
-                # Si no es JSON, procesar como antes
-                process_input = data
-                logger.info(f"✅ Procesando mensaje de texto plano: {process_input}")
+            else:
+                # Si no es JSON, procesar como antes (decodificando solo aquí si llegó en binario)
+                process_input = data if isinstance(data, str) else data.decode("utf-8", errors="replace")
+                logger.info("✅ Procesando mensaje de texto plano: %d caracteres", len(process_input))
             
             response = ""
             try:
-                result = await langroid_service.process_message(message=process_input)
-                bot_reply = result.get("reply", "Error procesando mensaje")
-                
-                # Asegurar que la respuesta sea string
-                if not isinstance(bot_reply, str):
-                    for attr in ["content", "text", "message", "body"]:
-                        if hasattr(bot_reply, attr):
-                            bot_reply = getattr(bot_reply, attr)
-                            break
-                    if not isinstance(bot_reply, str):
-                        try:
-                            response_dict = bot_reply if isinstance(bot_reply, dict) else bot_reply.__dict__
-                            for key in ["content", "text", "message", "body"]:
-                                if key in response_dict:
-                                    bot_reply = response_dict[key]
-                                    break
-                        except Exception:
-                            pass
-                    if not isinstance(bot_reply, str):
-                        bot_reply = str(bot_reply)
+                # Enviar los tokens a medida que llegan; cada send espera al socket (backpressure)
+                chunks = []
+                async for token in langroid_service.stream_message(message=process_input):
+                    chunks.append(token)
+                    await websocket.send_text(_CHUNK_PREFIX + orjson.dumps(token).decode() + _CHUNK_SUFFIX)
+                bot_reply = "".join(chunks)
                 
+                # Mensaje completo al final: cierra el stream y sirve a clientes sin soporte de chunks
                 # Crear respuesta estructurada en JSON para el frontend
                 response_data = {
                     "type": "message",
@@ -88,29 +120,28 @@ async def websocket_chat(websocket: WebSocket):
                         "message": bot_reply,
                         "isUser": False
                     },
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": _now_iso(),
                     "userId": None
                 }
-                response = json.dumps(response_data, ensure_ascii=False)
+                response = orjson.dumps(response_data).decode()
                         
             except Exception as e:
-                logger.error(f"Error procesando mensaje por WebSocket: {e}")
+                logger.error("Error procesando mensaje por WebSocket: %s", e)
                 error_response = {
                     "type": "error",
                     "data": {
-                        "message": "Error interno del chatbot.",
-                        "error": str(e)
+                        "message": "Error interno del chatbot."
                     },
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": _now_iso()
                 }
-                response = json.dumps(error_response, ensure_ascii=False)
+                response = orjson.dumps(error_response).decode()
                 
             await websocket.send_text(response)
             
     except WebSocketDisconnect:
         logger.info("WebSocket desconectado por el cliente (fuera del bucle).")
-        websocket_manager.disconnect(websocket)
     except Exception as e:
-        logger.error(f"Error en WebSocket: {e}")
-        websocket_manager.disconnect(websocket)
+        logger.error("Error en WebSocket: %s", e)
         await websocket.close()
+    finally:
+        websocket_manager.disconnect(websocket)
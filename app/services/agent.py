@@ -4,9 +4,31 @@ from openai import AsyncOpenAI
 from app.config import Config
 from app.services.qdrant import QdrantService
 from app.services.embedding import EmbeddingService
+from app.services.service_manager import service_manager
+from app.agents.utils import compact_prompt
 
 logger = logging.getLogger(__name__)
 
+# Prompt de sistema estático y byte-idéntico entre llamadas: el proveedor lo reutiliza como prefijo cacheado.
+# El contexto dinámico va siempre en el mensaje de usuario.
+_SYSTEM_PROMPT = compact_prompt("""
+    Eres HypatIA 🎓, asistente educativo especializado en cursos de Deep Learning y tecnologías afines.
+        
+        INSTRUCCIONES IMPORTANTES:
+        - SOLO usa información del contexto proporcionado (datos reales de la base de datos)
+        - La disponibilidad se indica claramente con ✅ Disponible o ❌ No disponible
+    - Si un curso muestra ✅ Disponible, significa que ESTÁ DISPONIBLE para inscripción
+    - Si un curso muestra ❌ No disponible, significa que NO ESTÁ DISPONIBLE para inscripción
+        - Responde con precisión sobre la disponibilidad basándote únicamente en estos indicadores
+        - La cantidad exacta de unidades no es relevante para el cliente
+    - NO inventes precios, cursos o características que no estén en el contexto
+        - Sé amigable, profesional y conciso
+        - Incluye emojis relevantes para hacer la conversación más amena
+        - Si el contexto está vacío, explica que necesitas más información
+        
+    Tu objetivo es ayudar a los estudiantes con información REAL y precisa sobre nuestros cursos.
+        """)
+
 # ==============================
 # Agente RAG Principal
 # ==============================
@@ -18,7 +40,13 @@ class AgentService:
         
         if Config.OPENAI_API_KEY:
             try:
-                self.openai_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+                # Cliente nativo async sobre el pool HTTP/2 compartido (sin hilos ni handshakes por llamada);
+                # el timeout del pool es corto, el del LLM se fija por petición
+                self.openai_client = AsyncOpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    timeout=Config.OPENAI_TIMEOUT,
+                    http_client=service_manager.get_http_client()
+                )
                 logger.info("✅ Cliente OpenAI inicializado para AgentService")
             except Exception as e:
                 logger.error(f"Error inicializando OpenAI: {e}")
@@ -117,24 +145,6 @@ class AgentService:
         """
         Genera respuesta usando OpenAI con el contexto de la KB real
         """
-        system_prompt = """
-    Eres HypatIA 🎓, asistente educativo especializado en cursos de Deep Learning y tecnologías afines.
-        
-        INSTRUCCIONES IMPORTANTES:
-        - SOLO usa información del contexto proporcionado (datos reales de la base de datos)
-        - La disponibilidad se indica claramente con ✅ Disponible o ❌ No disponible
-    - Si un curso muestra ✅ Disponible, significa que ESTÁ DISPONIBLE para inscripción
-    - Si un curso muestra ❌ No disponible, significa que NO ESTÁ DISPONIBLE para inscripción
-        - Responde con precisión sobre la disponibilidad basándote únicamente en estos indicadores
-        - La cantidad exacta de unidades no es relevante para el cliente
-    - NO inventes precios, cursos o características que no estén en el contexto
-        - Sé amigable, profesional y conciso
-        - Incluye emojis relevantes para hacer la conversación más amena
-        - Si el contexto está vacío, explica que necesitas más información
-        
-    Tu objetivo es ayudar a los estudiantes con información REAL y precisa sobre nuestros cursos.
-        """
-
         user_prompt = f"""
         Consulta del cliente: {query}
 
@@ -154,7 +164,7 @@ class AgentService:
             response = await self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": _SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt},
                 ],
                 max_tokens=600,
@@ -137,14 +137,14 @@ class AppInitializer:
         try:
             logger.info("🤖 Pre-cargando agentes Langroid...")
             
-            from app.agents import HypatiaAgentFactory
+            from app.services.service_manager import service_manager
             
-            # Pre-crear el agente principal
-            main_agent = HypatiaAgentFactory.create_main_agent()
+            # Pre-crear el agente principal compartido
+            langroid_service = service_manager.get_langroid_service()
             
             self._initialization_status['langroid_agents'] = {
                 "status": "success",
-                "agent_type": type(main_agent).__name__,
+                "agent_type": type(langroid_service.main_agent).__name__,
                 "message": "Agentes Langroid pre-cargados"
             }
             
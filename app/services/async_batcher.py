@@ -0,0 +1,64 @@
+"""
+Micro-batching asíncrono: agrupa llamadas cercanas en el tiempo en un solo flush
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AsyncBatcher:
+    """
+    Acumula items hasta max_size o max_wait segundos y los entrega juntos al handler.
+    Cada llamador recibe el resultado que le corresponde (o la excepción) por posición.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_size: int = 32,
+        max_wait: float = 0.05
+    ):
+        self._handler = handler
+        self._max_size = max_size
+        self._max_wait = max_wait
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Agrega un item al lote actual y espera su resultado"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        """Despacha el lote pendiente en una tarea aparte"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        try:
+            results = await self._handler(items)
+        except Exception as e:
+            logger.error("Error procesando lote de %s items: %s", len(items), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -107,13 +107,10 @@ class DataSyncService:
                 cursos = cursor.fetchall()
                 
                 synced_count = 0
-                for curso in cursos:
-                    # Create searchable text content
-                    content = self._create_curso_content(curso)
-                    
-                    # Generate embedding
-                    embedding = await self.embedding_service.generate_embedding(content)
-                    
+                # Create searchable text content and embed it in one batch
+                contents = [self._create_curso_content(curso) for curso in cursos]
+                embeddings = await self.embedding_service.generate_embeddings(contents)
+                for curso, content, embedding in zip(cursos, contents, embeddings):
                     doc_id = int(curso['id'])
                     
                     # Calcular disponibilidad basado en cupo
@@ -156,10 +153,9 @@ class DataSyncService:
                 categorias = cursor.fetchall()
                 
                 synced_count = 0
-                for categoria in categorias:
-                    content = self._create_categoria_content(categoria)
-                    embedding = await self.embedding_service.generate_embedding(content)
-                    
+                contents = [self._create_categoria_content(categoria) for categoria in categorias]
+                embeddings = await self.embedding_service.generate_embeddings(contents)
+                for categoria, content, embedding in zip(categorias, contents, embeddings):
                     doc_id = int(categoria['id']) + 1000000
                     
                     await self.qdrant_service.upsert_document(
@@ -199,10 +195,9 @@ class DataSyncService:
                 promociones = cursor.fetchall()
                 
                 synced_count = 0
-                for promocion in promociones:
-                    content = self._create_promocion_content(promocion)
-                    embedding = await self.embedding_service.generate_embedding(content)
-                    
+                contents = [self._create_promocion_content(promocion) for promocion in promociones]
+                embeddings = await self.embedding_service.generate_embeddings(contents)
+                for promocion, content, embedding in zip(promociones, contents, embeddings):
                     from datetime import date
                     today = date.today()
                     is_active = (promocion['fechaInicio'] <= today <= promocion['fechaFin'])
@@ -304,10 +299,9 @@ class DataSyncService:
                 cursos = cursor.fetchall()
                 
                 synced_count = 0
-                for curso in cursos:
-                    content = self._create_curso_content(curso)
-                    embedding = await self.embedding_service.generate_embedding(content)
-                    
+                contents = [self._create_curso_content(curso) for curso in cursos]
+                embeddings = await self.embedding_service.generate_embeddings(contents)
+                for curso, content, embedding in zip(cursos, contents, embeddings):
                     doc_id = int(curso['id'])
                     
                     # Calcular disponibilidad basado en cupo
@@ -348,10 +342,9 @@ class DataSyncService:
                 categorias = cursor.fetchall()
                 
                 synced_count = 0
-                for categoria in categorias:
-                    content = self._create_categoria_content(categoria)
-                    embedding = await self.embedding_service.generate_embedding(content)
-                    
+                contents = [self._create_categoria_content(categoria) for categoria in categorias]
+                embeddings = await self.embedding_service.generate_embeddings(contents)
+                for categoria, content, embedding in zip(categorias, contents, embeddings):
                     doc_id = int(categoria['id']) + 1000000
                     
                     await self.qdrant_service.upsert_document(
@@ -392,10 +385,9 @@ class DataSyncService:
                 promociones = cursor.fetchall()
                 
                 synced_count = 0
-                for promocion in promociones:
-                    content = self._create_promocion_content(promocion)
-                    embedding = await self.embedding_service.generate_embedding(content)
-                    
+                contents = [self._create_promocion_content(promocion) for promocion in promociones]
+                embeddings = await self.embedding_service.generate_embeddings(contents)
+                for promocion, content, embedding in zip(promociones, contents, embeddings):
                     from datetime import date
                     today = date.today()
                     is_active = (promocion['fechaInicio'] <= today <= promocion['fechaFin'])
@@ -1,16 +1,55 @@
 from sentence_transformers import SentenceTransformer
+from cachetools import TTLCache
+from functools import lru_cache
 from typing import List, Union
+import asyncio
 import logging
+import os
+import threading
 import numpy as np
+import torch
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Embeddings de consultas recientes: el mismo mensaje se embebe para la cache semántica
+# y de nuevo en las herramientas de búsqueda, y las consultas populares se repiten
+_query_embeddings: TTLCache = TTLCache(maxsize=2048, ttl=600)
+_query_embeddings_lock = threading.Lock()
+
+def _onnx_model_kwargs() -> dict:
+    """Sesión de onnxruntime en CPU con todas las optimizaciones de grafo"""
+    import onnxruntime as ort
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // 2)
+    model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+    if Config.EMBEDDING_ONNX_FILE:
+        model_kwargs["file_name"] = Config.EMBEDDING_ONNX_FILE
+    return model_kwargs
+
+@lru_cache(maxsize=1)
+def _get_embedder() -> SentenceTransformer:
+    """Modelo de embeddings único por proceso, listo para inferencia en CPU"""
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // 2))
+    torch.set_grad_enabled(False)
+    if Config.EMBEDDING_BACKEND == "onnx":
+        # Si el repo del modelo no trae el .onnx, sentence-transformers lo exporta al cargar
+        model = SentenceTransformer(
+            Config.EMBEDDING_MODEL,
+            backend="onnx",
+            model_kwargs=_onnx_model_kwargs()
+        )
+    else:
+        model = SentenceTransformer(Config.EMBEDDING_MODEL)
+    model.eval()
+    return model
+
 class EmbeddingService:
     def __init__(self):
         """Initialize embedding model"""
         try:
-            self.model = SentenceTransformer(Config.EMBEDDING_MODEL)
+            self.model = _get_embedder()
             self.dimension = Config.EMBEDDING_DIMENSION
             logger.info(f"Loaded embedding model: {Config.EMBEDDING_MODEL}")
         except Exception as e:
@@ -22,10 +61,28 @@ class EmbeddingService:
         Generates an embedding for a given text using a pre-trained model.
         """
         # Encode the text to a numerical vector
-        embedding = self.model.encode(text)
+        with torch.inference_mode():
+            embedding = self.model.encode(text)
         
         # Convert the numpy array to a list of floats
         return embedding.tolist()
+
+    async def generate_embeddings(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """
+        Generates embeddings for many texts with batched encode calls.
+        sentence-transformers sorts the inputs by length before batching, so each
+        batch is padded only up to its own longest text.
+        """
+        if not texts:
+            return []
+        # El corpus completo tarda: se codifica en un hilo para no bloquear el event loop
+        embeddings = await asyncio.to_thread(self._encode_batch, texts, batch_size)
+        return embeddings.tolist()
+
+    def _encode_batch(self, texts: List[str], batch_size: int):
+        # inference_mode es por hilo: se activa dentro del hilo que ejecuta el encode
+        with torch.inference_mode():
+            return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
     
     def encode_text(self, text: Union[str, List[str]]) -> Union[List[float], List[List[float]]]:
         """
@@ -40,15 +97,17 @@ class EmbeddingService:
         try:
             if isinstance(text, str):
                 # Single text
-                embedding = self.model.encode(text, convert_to_tensor=False)
+                with torch.inference_mode():
+                    embedding = self.model.encode(text, convert_to_tensor=False)
                 return embedding.tolist()
             else:
                 # List of texts
-                embeddings = self.model.encode(text, convert_to_tensor=False)
+                with torch.inference_mode():
+                    embeddings = self.model.encode(text, convert_to_tensor=False)
                 return [emb.tolist() for emb in embeddings]
                 
         except Exception as e:
-            logger.error(f"Error encoding text: {str(e)}")
+            logger.error("Error encoding text: %s", e)
             if isinstance(text, str):
                 return [0.0] * self.dimension
             else:
@@ -64,7 +123,16 @@ class EmbeddingService:
         Returns:
             Embedding vector for the query
         """
-        return self.encode_text(query)
+        with _query_embeddings_lock:
+            cached = _query_embeddings.get(query)
+        if cached is not None:
+            return cached
+        embedding = self.encode_text(query)
+        # El vector cero es el fallback de error: no se cachea
+        if any(embedding):
+            with _query_embeddings_lock:
+                _query_embeddings[query] = embedding
+        return embedding
     
     def encode_documents(self, documents: List[str]) -> List[List[float]]:
         """
@@ -78,6 +146,15 @@ class EmbeddingService:
         """
         return self.encode_text(documents)
     
+    def warmup(self):
+        """
+        Runs one single-text and one batched encode so the tokenizer, the ONNX Runtime
+        allocator and its kernels are initialized before the first real request.
+        """
+        with torch.inference_mode():
+            self.model.encode("hola", convert_to_numpy=True)
+            self.model.encode(["hola", "cursos de deep learning para principiantes"], convert_to_numpy=True)
+    
     def similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
         Calculate cosine similarity between two embeddings
@@ -117,6 +194,8 @@ class EmbeddingService:
         """
         return {
             'model_name': Config.EMBEDDING_MODEL,
+            'backend': Config.EMBEDDING_BACKEND,
+            'onnx_file': Config.EMBEDDING_ONNX_FILE if Config.EMBEDDING_BACKEND == "onnx" else None,
             'dimension': self.dimension,
             'max_seq_length': getattr(self.model, 'max_seq_length', 'Unknown')
         }
\ No newline at end of file
@@ -1,17 +1,32 @@
 """
 Servicio principal que reemplaza el AgentService original usando Langroid
 """
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, List, Optional, AsyncIterator, Set, Tuple
 from datetime import datetime
+from cachetools import TTLCache
 
 from app.agents import HypatiaAgentFactory, MainHypatiaAgent
 from app.agents.config import langroid_config
 from app.models.chat.ChatModel import ChatCreate
 from app.models.mensaje.MensajeModel import MensajeCreate
+from app.services.async_batcher import AsyncBatcher
 
 logger = logging.getLogger(__name__)
 
+# Chat activo por usuario: evita el SELECT de chats en cada turno de la conversación
+_active_chat_ids: TTLCache = TTLCache(maxsize=10000, ttl=300)
+# TTLCache no es thread-safe: el DELETE de chats (threadpool) y el event loop la comparten
+_active_chat_ids_lock = threading.Lock()
+
+def forget_active_chat(chat_id: int):
+    """Saca un chat eliminado de la cache de chats activos"""
+    with _active_chat_ids_lock:
+        for user_id in [u for u, c in list(_active_chat_ids.items()) if c == chat_id]:
+            _active_chat_ids.pop(user_id, None)
+
 class LangroidAgentService:
     """
     Servicio principal que usa Langroid Multi-Agent Framework
@@ -20,6 +35,10 @@ class LangroidAgentService:
     
     def __init__(self):
         self.main_agent: Optional[MainHypatiaAgent] = None
+        # Escrituras de turnos en curso (referencias fuertes hasta que terminan)
+        self._persist_tasks: Set[asyncio.Task] = set()
+        # Turnos de conversaciones concurrentes se agrupan en un único INSERT multi-fila
+        self._persist_batcher = AsyncBatcher(self._write_turns, max_size=32, max_wait=0.5)
         self._initialize_agents()
     
     def _initialize_agents(self):
@@ -42,7 +61,7 @@ class LangroidAgentService:
             persist_conversation: Si persistir la conversación en BD
             
         Returns:
-            Dict con la respuesta y metadatos
+            Dict con la respuesta y metadatos; "reply" es siempre str
         """
         try:
             if not self.main_agent:
@@ -54,51 +73,29 @@ class LangroidAgentService:
                     "conversation_stats": {}
                 }
             
-            logger.info(f"Procesando mensaje con Langroid: {message[:50]}...")
-            
-            # Obtener contexto de conversación si existe usuario
-            conversation_context = {}
-            active_chat_id = None
-            
-            if user_id and persist_conversation:
-                from app.controllers.mensaje.MensajeController import MensajeController
-                
-                # Obtener o crear chat activo
-                active_chat_id = await self._get_or_create_active_chat(user_id)
-                
-                # Obtener contexto reciente
-                if active_chat_id:
-                    mensaje_controller = MensajeController()
-                    recent_messages = mensaje_controller.get_mensajes_by_chat(
-                        active_chat_id, limit=5, offset=0
-                    )
-                    conversation_context = {
-                        "recent_messages": [
-                            {
-                                "tipo": msg.tipo,
-                                "contenido": msg.contenido,
-                                "fecha": msg.fechaEnvio.isoformat() if msg.fechaEnvio else None
-                            }
-                            for msg in recent_messages
-                        ]
-                    }
+            logger.info("Procesando mensaje con Langroid: %.50s...", message)
             
-            bot_response = await self.main_agent.handle_user_message(
+            # El agente arma su propio contexto (RAG + ventas): no se consultan ni
+            # serializan los mensajes recientes del chat en cada turno
+            agent_call = self.main_agent.handle_user_message(
                 message=message,
-                user_id=user_id,
-                conversation_context=conversation_context
+                user_id=user_id
             )
             
+            if user_id and persist_conversation:
+                # El chat activo solo se necesita para persistir: se resuelve mientras responde el agente
+                bot_response, active_chat_id = await asyncio.gather(
+                    agent_call, self._get_or_create_active_chat(user_id)
+                )
+            else:
+                bot_response, active_chat_id = await agent_call, None
+            
             # Obtener estadísticas de la conversación
             conversation_stats = self.main_agent.get_conversation_stats()
             
-            # Persistir conversación si se requiere
+            # Persistir conversación si se requiere (en segundo plano, no retrasa la respuesta)
             if persist_conversation and user_id and active_chat_id:
-                await self._persist_conversation(
-                    chat_id=active_chat_id,
-                    user_message=message,
-                    bot_response=bot_response
-                )
+                self._schedule_persist(active_chat_id, message, bot_response)
             
             logger.info("✅ Mensaje procesado exitosamente con Langroid")
             
@@ -123,72 +120,105 @@ class LangroidAgentService:
                 "error_details": str(e)
             }
     
+    async def stream_message(self, message: str, user_id: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Procesa un mensaje y emite la respuesta a medida que el LLM la genera
+        
+        Args:
+            message: Mensaje del usuario
+            user_id: ID del usuario (opcional, habilita la persistencia)
+            
+        Yields:
+            Fragmentos de texto de la respuesta
+        """
+        if not self.main_agent:
+            yield "Lo siento, el sistema no está disponible en este momento. Por favor contacta al administrador."
+            return
+        
+        # Resolver el chat activo en paralelo al streaming, no después del último token
+        chat_task = asyncio.create_task(self._get_or_create_active_chat(user_id)) if user_id else None
+        parts = []
+        try:
+            async for token in self.main_agent.stream_user_message(message=message, user_id=user_id):
+                parts.append(token)
+                yield token
+        except BaseException:
+            if chat_task:
+                chat_task.cancel()
+            raise
+        
+        if chat_task:
+            active_chat_id = await chat_task
+            if active_chat_id:
+                self._schedule_persist(active_chat_id, message, "".join(parts))
+    
     async def _get_or_create_active_chat(self, user_id: int) -> Optional[int]:
         """Obtiene o crea un chat activo para el usuario"""
+        with _active_chat_ids_lock:
+            cached_chat_id = _active_chat_ids.get(user_id)
+        if cached_chat_id is not None:
+            return cached_chat_id
         try:
             from app.controllers.chat.ChatController import ChatController
             
-            chat_controller = ChatController()
-            # Buscar chats existentes del usuario
-            user_chats = chat_controller.get_chats_by_usuario(user_id)
+            # Chat más reciente del usuario (la base ordena y limita)
+            chat_id = await ChatController.get_latest_chat_id_async(user_id)
             
-            if user_chats:
-                # Retornar el chat más reciente
-                latest_chat = max(user_chats, key=lambda x: x.fechaCreacion)
-                return latest_chat.id
-            else:
+            if chat_id is None:
                 # Crear nuevo chat con campos válidos del modelo ChatCreate
                 new_chat = ChatCreate(
                     usuarioId=user_id,
                     chatId=f"telegram_{user_id}_{int(datetime.now().timestamp())}"
                 )
-                created_chat = chat_controller.create_chat(new_chat)
-                return created_chat.id if created_chat else None
+                chat_id = await ChatController.create_chat_async(new_chat)
+            
+            with _active_chat_ids_lock:
+                _active_chat_ids[user_id] = chat_id
+            return chat_id
                 
         except Exception as e:
             logger.error(f"Error gestionando chat activo: {str(e)}")
             return None
     
+    def _schedule_persist(self, chat_id: int, user_message: str, bot_response: str):
+        """Lanza la persistencia del turno como tarea de fondo"""
+        task = asyncio.create_task(self._persist_conversation(chat_id, user_message, bot_response))
+        self._persist_tasks.add(task)
+        task.add_done_callback(self._persist_tasks.discard)
+    
+    async def flush_pending_persistence(self, timeout: float = 10.0):
+        """Espera a que terminen las escrituras de turnos pendientes (al apagar la app)"""
+        if not self._persist_tasks:
+            return
+        _, pending = await asyncio.wait(list(self._persist_tasks), timeout=timeout)
+        if pending:
+            logger.warning("%s turnos sin persistir al cerrar el servicio", len(pending))
+    
     async def _persist_conversation(self, chat_id: int, user_message: str, bot_response: str):
         """Persiste la conversación en la base de datos"""
         try:
-            from app.controllers.mensaje.MensajeController import MensajeController
-            
-            mensaje_controller = MensajeController()
+            # Ambos textos llegan como str: el agente normaliza la respuesta en su origen
+            await self._persist_batcher.submit((chat_id, user_message, bot_response))
             
-            user_content = user_message
-            if hasattr(user_message, 'content'):
-                user_content = user_message.content
-            elif not isinstance(user_message, str):
-                user_content = str(user_message)
-            
-            bot_content = bot_response
-            if hasattr(bot_response, 'content'):
-                bot_content = bot_response.content
-            elif not isinstance(bot_response, str):
-                bot_content = str(bot_response)
-            
-            # Guardar mensaje del usuario
-            user_msg = MensajeCreate(
-                chatId=chat_id,
-                tipo="usuario",
-                contenido=user_content
-            )
-            mensaje_controller.create_mensaje(user_msg)
-            
-            # Guardar respuesta del bot
-            bot_msg = MensajeCreate(
-                chatId=chat_id,
-                tipo="bot",
-                contenido=bot_content
-            )
-            mensaje_controller.create_mensaje(bot_msg)
-            
-            logger.debug(f"Conversación persistida en chat {chat_id}")
+            logger.debug("Conversación persistida en chat %s", chat_id)
             
         except Exception as e:
             logger.error(f"Error persistiendo conversación: {str(e)}")
     
+    async def _write_turns(self, turns: List[Tuple[int, str, str]]) -> List[None]:
+        """Guarda los turnos del lote (usuario + bot de cada uno) en un solo INSERT atómico"""
+        from app.controllers.mensaje.MensajeController import MensajeController
+        
+        await MensajeController.create_mensajes_async([
+            mensaje
+            for chat_id, user_message, bot_response in turns
+            for mensaje in (
+                MensajeCreate(chatId=chat_id, tipo="usuario", contenido=user_message),
+                MensajeCreate(chatId=chat_id, tipo="bot", contenido=bot_response)
+            )
+        ])
+        return [None] * len(turns)
+    
     def get_agent_info(self) -> Dict[str, Any]:
         """Obtiene información sobre el sistema de agentes"""
         return {
@@ -239,8 +269,7 @@ class LangroidAgentService:
                 db_stats = mensaje_controller.get_chat_statistics(chat_id)
             elif user_id:
                 from app.controllers.chat.ChatController import ChatController
-                chat_controller = ChatController()
-                user_chats = chat_controller.get_chats_by_usuario(user_id)
+                user_chats = await ChatController.get_chats_by_usuario_async(user_id)
                 db_stats = {
                     "total_chats": len(user_chats),
                     "active_chats": len([c for c in user_chats if c.activo])
@@ -278,7 +307,8 @@ class HypatiaLangroidAgent:
     """
     
     def __init__(self):
-        self.langroid_service = LangroidAgentService()
+        from app.services.service_manager import service_manager
+        self.langroid_service = service_manager.get_langroid_service()
     
     async def process_message(self, message: str, user_info: Dict[str, Any] = None) -> str:
         """
@@ -3,7 +3,7 @@
 import os
 import logging
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 
 from qdrant_client import QdrantClient
 from qdrant_client import models
@@ -21,6 +21,17 @@ QDRANT_ENABLED = os.getenv("QDRANT_ENABLED", "true").lower() == "true"
 EMBED_MODEL = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-small")
 VECTOR_SIZE = int(os.getenv("VECTOR_SIZE", 384))
 
+# Parámetros del índice HNSW (grafo de vecinos) y del ancho de búsqueda
+HNSW_M = int(os.getenv("QDRANT_HNSW_M", 32))
+HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", 100))
+HNSW_EF_SEARCH = int(os.getenv("QDRANT_HNSW_EF_SEARCH", 64))
+
+# Cuantización de vectores: sq8 (int8 escalar), pq (producto) o none
+RAG_QUANTIZATION = os.getenv("RAG_QUANTIZATION", "sq8").lower()
+QUANTIZATION_OVERSAMPLING = float(os.getenv("RAG_QUANTIZATION_OVERSAMPLING", 4.0))
+# Tipo de los vectores originales: float32 o float16 (solo aplica al crear la colección)
+RAG_VECTOR_DTYPE = os.getenv("RAG_VECTOR_DTYPE", "float32").lower()
+
 _client: Optional[QdrantClient] = None
 
 class QdrantService:
@@ -41,21 +52,89 @@ class QdrantService:
             if self.collection_name not in collection_names:
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=self.vector_size,
-                        distance=Distance.COSINE
-                    )
+                    vectors_config=self._vectors_config(),
+                    hnsw_config=self._hnsw_config(),
+                    quantization_config=self._quantization_config()
                 )
                 logger.info(f"Created collection: {self.collection_name}")
                 
                 self._create_payload_indexes()
             else:
                 logger.info(f"Collection {self.collection_name} already exists")
+                self._sync_index_config()
                 self._create_payload_indexes()
         except Exception as e:
             logger.error(f"Error creating collection: {str(e)}")
             raise
     
+    def _sync_index_config(self):
+        """Aplica HNSW/cuantización a una colección existente solo si difieren; un fallo no aborta el arranque"""
+        try:
+            config = self.client.get_collection(self.collection_name).config
+            hnsw = self._hnsw_config()
+            quantization = self._quantization_config()
+            if (
+                config.hnsw_config.m == hnsw.m
+                and config.hnsw_config.ef_construct == hnsw.ef_construct
+                and config.quantization_config == quantization
+            ):
+                return
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                hnsw_config=hnsw,
+                quantization_config=quantization
+            )
+            logger.info("Updated index configuration of collection %s", self.collection_name)
+        except Exception as e:
+            logger.warning("Could not update index configuration of %s: %s", self.collection_name, e)
+    
+    def _vectors_config(self) -> VectorParams:
+        """Vectores coseno; float16 reduce a la mitad los bytes que recorre el kernel SIMD de distancia"""
+        return VectorParams(
+            size=self.vector_size,
+            distance=Distance.COSINE,
+            datatype=models.Datatype.FLOAT16 if RAG_VECTOR_DTYPE == "float16" else models.Datatype.FLOAT32
+        )
+
+    @staticmethod
+    def _hnsw_config() -> models.HnswConfigDiff:
+        """Configuración del índice HNSW de la colección"""
+        return models.HnswConfigDiff(
+            m=HNSW_M,
+            ef_construct=HNSW_EF_CONSTRUCT
+        )
+
+    @staticmethod
+    def _quantization_config() -> Optional[models.QuantizationConfig]:
+        """Vectores cuantizados en RAM para el recorrido HNSW; los FP32 quedan para el rescore"""
+        if RAG_QUANTIZATION == "sq8":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=True
+                )
+            )
+        if RAG_QUANTIZATION == "pq":
+            return models.ProductQuantization(
+                product=models.ProductQuantizationConfig(
+                    compression=models.CompressionRatio.X16,
+                    always_ram=True
+                )
+            )
+        return None
+
+    @staticmethod
+    def _search_params() -> models.SearchParams:
+        """Parámetros de búsqueda: ancho HNSW y rescore exacto sobre candidatos sobremuestreados"""
+        quantization = None
+        if RAG_QUANTIZATION in ("sq8", "pq"):
+            quantization = models.QuantizationSearchParams(
+                rescore=True,
+                oversampling=QUANTIZATION_OVERSAMPLING
+            )
+        return models.SearchParams(hnsw_ef=HNSW_EF_SEARCH, quantization=quantization)
+
     def _create_payload_indexes(self):
         """Create payload indexes for efficient filtering"""
         try:
@@ -92,10 +171,9 @@ class QdrantService:
             if self.collection_name not in collection_names:
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=self.vector_size,
-                        distance=Distance.COSINE
-                    )
+                    vectors_config=self._vectors_config(),
+                    hnsw_config=self._hnsw_config(),
+                    quantization_config=self._quantization_config()
                 )
                 logger.info(f"Created collection: {self.collection_name}")
                 
@@ -132,7 +210,7 @@ class QdrantService:
                 points=[point]
             )
             
-            logger.debug(f"Upserted document {doc_id} to Qdrant")
+            logger.debug("Upserted document %s to Qdrant", doc_id)
             return True
             
         except Exception as e:
@@ -171,18 +249,12 @@ class QdrantService:
             return False
     
     def search_similar(self, query_vector: List[float], limit: int = 5, 
-                      filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
+                      filters: Optional[Dict[str, Any]] = None,
+                      payload_fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Search for similar documents; payload_fields limits the payload returned by Qdrant"""
         try:
-            try:
-                collection_info = self.client.get_collection(self.collection_name)
-                if collection_info.points_count == 0:
-                    logger.warning(f"Collection {self.collection_name} exists but is empty")
-                    return []
-            except Exception as e:
-                logger.error(f"Collection {self.collection_name} not found or inaccessible: {str(e)}")
-                return []
-            
+            # Sin get_collection previo: una colección vacía devuelve [] y una inexistente
+            # lanza error, que se registra abajo; así cada búsqueda es un solo round-trip
             search_filter = None
             if filters:
                 conditions = []
@@ -210,7 +282,9 @@ class QdrantService:
                 query_vector=query_vector,
                 limit=limit,
                 query_filter=search_filter,
-                with_payload=True
+                search_params=self._search_params(),
+                with_payload=list(payload_fields) if payload_fields else True,
+                with_vectors=False
             )
             
             documents = []
@@ -228,11 +302,12 @@ class QdrantService:
                 }
                 documents.append(doc)
             
-            logger.debug(f"Found {len(documents)} similar documents with scores: {[d['score'] for d in documents]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Found %d similar documents with scores: %s", len(documents), [d['score'] for d in documents])
             return documents
             
         except Exception as e:
-            logger.error(f"Error searching documents: {str(e)}")
+            logger.error("Error searching documents: %s", e)
             return []
 
     def delete_documents(self, document_ids: List[str]) -> bool:
@@ -134,7 +134,10 @@ class QueryOptimizer:
             "CREATE INDEX idx_promocion_fechas ON promocion(fechaInicio, fechaFin);",
             "CREATE INDEX idx_promocion_activa ON promocion(fechaInicio, fechaFin) WHERE fechaInicio <= CURDATE() AND fechaFin >= CURDATE();",
             "CREATE INDEX idx_promocion_curso_composite ON promocionCurso(promocionId, cursoId);",
-            "CREATE INDEX idx_categoria_nombre ON categoria(nombre);"
+            "CREATE INDEX idx_categoria_nombre ON categoria(nombre);",
+            "CREATE INDEX idx_usuario_username ON usuario(username);",
+            "CREATE INDEX idx_mensaje_chat_fecha ON mensaje(chatId, fechaEnvio);",
+            "CREATE INDEX idx_chat_usuario_fecha ON chat(usuarioId, fechaCreacion DESC);"
         ]
 
 # Instancia global del optimizador
@@ -1,13 +1,26 @@
 import redis
+import redis.asyncio as aioredis
 import os
 
+def _redis_params() -> dict:
+    return dict(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        db=int(os.getenv("REDIS_DB", 0)),
+        password=os.getenv("REDIS_PASSWORD", None)
+    )
+
+_RELEASE_LOCK_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
 class RedisCache:
     def __init__(self):
         self.client = redis.Redis(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=int(os.getenv("REDIS_PORT", 6379)),
-            db=int(os.getenv("REDIS_DB", 0)),
-            password=os.getenv("REDIS_PASSWORD", None),
+            **_redis_params(),
             decode_responses=True
         )
 
@@ -19,3 +32,34 @@ class RedisCache:
 
     def delete(self, key: str):
         self.client.delete(key)
+
+    def delete_pattern(self, pattern: str):
+        keys = list(self.client.scan_iter(match=pattern))
+        if keys:
+            self.client.delete(*keys)
+
+class AsyncRedisCache:
+    """Variante asyncio para endpoints async; guarda bytes (payloads JSON pre-serializados)"""
+
+    def __init__(self):
+        self.client = aioredis.Redis(**_redis_params())
+        self._release_script = self.client.register_script(_RELEASE_LOCK_LUA)
+
+    async def get(self, key: str):
+        return await self.client.get(key)
+
+    async def set(self, key: str, value, expire_seconds: int = 3600):
+        await self.client.setex(key, expire_seconds, value)
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+    async def acquire_lock(self, key: str, token: str, expire_seconds: int = 10) -> bool:
+        return bool(await self.client.set(key, token, nx=True, ex=expire_seconds))
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        # Compare-and-delete atómico: solo el dueño del lock lo libera
+        return bool(await self._release_script(keys=[key], args=[token]))
+
+    async def close(self):
+        await self.client.aclose()
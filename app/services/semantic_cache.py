@@ -0,0 +1,79 @@
+"""
+Cache semántica de respuestas: reutiliza la respuesta de una consulta parecida (coseno)
+"""
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", 4096))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))
+# Misma vida que la cache exacta de respuestas: precios y disponibilidad cambian
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", 3600))
+
+class SemanticCache:
+    """
+    Buffer circular de embeddings normalizados (float32, C-contiguo) y sus respuestas.
+    La búsqueda es un único producto matriz-vector sobre las entradas vigentes del mismo usuario.
+    """
+
+    def __init__(self, dimension: int, size: int = SEMANTIC_CACHE_SIZE, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl: float = SEMANTIC_CACHE_TTL):
+        self._embs = np.zeros((size, dimension), dtype=np.float32)
+        self._users = np.full(size, -1, dtype=np.int64)
+        # Instante de inserción (monotónico) por slot; las entradas más viejas que el TTL no se sirven
+        self._stamps = np.zeros(size, dtype=np.float64)
+        self._ttl = ttl
+        self._replies: List[Optional[str]] = [None] * size
+        self._size = size
+        self._threshold = threshold
+        self._count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def get(self, embedding: List[float], user_id: Optional[int] = None) -> Optional[str]:
+        """Respuesta cacheada más similar para el usuario si supera el umbral"""
+        query = self._normalize(embedding)
+        if query is None or self._count == 0:
+            return None
+        # Solo las filas del usuario entran en el producto: el kernel recorre k filas, no el buffer entero
+        owner = user_id if user_id is not None else -1
+        fresh_since = time.monotonic() - self._ttl
+        rows = np.flatnonzero(
+            (self._users[:self._count] == owner) & (self._stamps[:self._count] >= fresh_since)
+        )
+        if rows.size == 0:
+            return None
+        sims = self._embs[rows] @ query
+        best = int(sims.argmax())
+        if sims[best] < self._threshold:
+            return None
+        logger.debug("Cache semántica: similitud %.3f", sims[best])
+        return self._replies[rows[best]]
+
+    def set(self, embedding: List[float], reply: str, user_id: Optional[int] = None):
+        """Inserta la respuesta sobrescribiendo la entrada más antigua si el buffer está lleno"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            slot = self._next
+            self._embs[slot] = vector
+            self._users[slot] = user_id if user_id is not None else -1
+            self._replies[slot] = reply
+            self._stamps[slot] = time.monotonic()
+            self._next = (slot + 1) % self._size
+            self._count = min(self._count + 1, self._size)
@@ -27,55 +27,131 @@ class ServiceManager:
             self._embedding_service: Optional[Any] = None
             self._qdrant_service: Optional[Any] = None
             self._redis_cache: Optional[Any] = None
+            self._async_redis_cache: Optional[Any] = None
+            self._langroid_service: Optional[Any] = None
+            self._http_client: Optional[Any] = None
             self._initialization_times: Dict[str, float] = {}
+            # Reentrante: la inicialización de un servicio puede pedir otro (langroid -> embedding)
+            self._services_lock = threading.RLock()
             self._initialized = True
             logger.info("ServiceManager singleton inicializado")
     
     def get_embedding_service(self):
         """Obtiene instancia singleton del EmbeddingService"""
         if self._embedding_service is None:
-            logger.info("Inicializando EmbeddingService singleton...")
-            start_time = datetime.now()
+            with self._services_lock:
+                if self._embedding_service is None:
+                    logger.info("Inicializando EmbeddingService singleton...")
+                    start_time = datetime.now()
             
-            from app.services.embedding import EmbeddingService
-            self._embedding_service = EmbeddingService()
+                    from app.services.embedding import EmbeddingService
+                    self._embedding_service = EmbeddingService()
             
-            init_time = (datetime.now() - start_time).total_seconds()
-            self._initialization_times['embedding'] = init_time
-            logger.info(f"EmbeddingService inicializado en {init_time:.2f}s")
+                    init_time = (datetime.now() - start_time).total_seconds()
+                    self._initialization_times['embedding'] = init_time
+                    logger.info(f"EmbeddingService inicializado en {init_time:.2f}s")
         
         return self._embedding_service
     
     def get_qdrant_service(self):
         """Obtiene instancia singleton del QdrantService"""
         if self._qdrant_service is None:
-            logger.info("Inicializando QdrantService singleton...")
-            start_time = datetime.now()
+            with self._services_lock:
+                if self._qdrant_service is None:
+                    logger.info("Inicializando QdrantService singleton...")
+                    start_time = datetime.now()
             
-            from app.services.qdrant import QdrantService
-            self._qdrant_service = QdrantService()
+                    from app.services.qdrant import QdrantService
+                    self._qdrant_service = QdrantService()
             
-            init_time = (datetime.now() - start_time).total_seconds()
-            self._initialization_times['qdrant'] = init_time
-            logger.info(f"QdrantService inicializado en {init_time:.2f}s")
+                    init_time = (datetime.now() - start_time).total_seconds()
+                    self._initialization_times['qdrant'] = init_time
+                    logger.info(f"QdrantService inicializado en {init_time:.2f}s")
         
         return self._qdrant_service
     
     def get_redis_cache(self):
         """Obtiene instancia singleton del RedisCache"""
         if self._redis_cache is None:
-            logger.info("Inicializando RedisCache singleton...")
-            start_time = datetime.now()
+            with self._services_lock:
+                if self._redis_cache is None:
+                    logger.info("Inicializando RedisCache singleton...")
+                    start_time = datetime.now()
             
-            from app.services.redis_cache import RedisCache
-            self._redis_cache = RedisCache()
+                    from app.services.redis_cache import RedisCache
+                    self._redis_cache = RedisCache()
             
-            init_time = (datetime.now() - start_time).total_seconds()
-            self._initialization_times['redis'] = init_time
-            logger.info(f"RedisCache inicializado en {init_time:.2f}s")
+                    init_time = (datetime.now() - start_time).total_seconds()
+                    self._initialization_times['redis'] = init_time
+                    logger.info(f"RedisCache inicializado en {init_time:.2f}s")
         
         return self._redis_cache
     
+    def get_async_redis_cache(self):
+        """Obtiene instancia singleton del AsyncRedisCache"""
+        if self._async_redis_cache is None:
+            with self._services_lock:
+                if self._async_redis_cache is None:
+                    from app.services.redis_cache import AsyncRedisCache
+                    self._async_redis_cache = AsyncRedisCache()
+                    logger.info("AsyncRedisCache inicializado")
+        
+        return self._async_redis_cache
+    
+    async def close_async_redis_cache(self):
+        """Cierra el cliente Redis asíncrono"""
+        if self._async_redis_cache is not None:
+            await self._async_redis_cache.close()
+            self._async_redis_cache = None
+    
+    def get_langroid_service(self):
+        """Obtiene instancia singleton del LangroidAgentService"""
+        if self._langroid_service is None:
+            with self._services_lock:
+                if self._langroid_service is None:
+                    logger.info("Inicializando LangroidAgentService singleton...")
+                    start_time = datetime.now()
+            
+                    from app.services.langroid_service import LangroidAgentService
+                    self._langroid_service = LangroidAgentService()
+            
+                    init_time = (datetime.now() - start_time).total_seconds()
+                    self._initialization_times['langroid'] = init_time
+                    logger.info(f"LangroidAgentService inicializado en {init_time:.2f}s")
+        
+        return self._langroid_service
+    
+    def get_http_client(self):
+        """Obtiene el httpx.AsyncClient compartido (keep-alive + HTTP/2)"""
+        if self._http_client is None:
+            with self._services_lock:
+                if self._http_client is None:
+                    import httpx
+                    self._http_client = httpx.AsyncClient(
+                        http2=True,
+                        timeout=httpx.Timeout(10.0, connect=2.0),
+                        limits=httpx.Limits(
+                            max_connections=100,
+                            max_keepalive_connections=50,
+                            keepalive_expiry=60
+                        )
+                    )
+                    logger.info("httpx.AsyncClient compartido inicializado")
+        
+        return self._http_client
+    
+    async def close_langroid_service(self):
+        """Espera las escrituras de conversación en curso del LangroidAgentService"""
+        if self._langroid_service is not None:
+            await self._langroid_service.flush_pending_persistence()
+    
+    async def close_http_client(self):
+        """Cierra el httpx.AsyncClient compartido"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            logger.info("httpx.AsyncClient compartido cerrado")
+    
     def preload_services(self):
         """Pre-carga todos los servicios críticos al inicio de la aplicación"""
         logger.info("🚀 Iniciando pre-carga de servicios críticos...")
@@ -83,7 +159,8 @@ class ServiceManager:
         services = [
             ('embedding', self.get_embedding_service),
             ('qdrant', self.get_qdrant_service),
-            ('redis', self.get_redis_cache)
+            ('redis', self.get_redis_cache),
+            ('langroid', self.get_langroid_service)
         ]
         
         total_start = datetime.now()
@@ -109,7 +186,8 @@ class ServiceManager:
             "services_loaded": {
                 "embedding": self._embedding_service is not None,
                 "qdrant": self._qdrant_service is not None,
-                "redis": self._redis_cache is not None
+                "redis": self._redis_cache is not None,
+                "langroid": self._langroid_service is not None
             }
         }
     
@@ -119,6 +197,7 @@ class ServiceManager:
         self._embedding_service = None
         self._qdrant_service = None
         self._redis_cache = None
+        self._langroid_service = None
         self._initialization_times.clear()
 
 # Instancia global del service manager
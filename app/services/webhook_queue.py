@@ -0,0 +1,114 @@
+"""
+Cola en memoria con pool de workers para procesar webhooks fuera del request
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class WebhookQueue:
+    """Cola acotada que desacopla el ACK del webhook del procesamiento con el LLM"""
+
+    def __init__(self, maxsize: int, workers: int):
+        self._maxsize = maxsize
+        self._num_workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+        self._handler: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+        self._stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "in_flight": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0
+        }
+
+    def start(self, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Crea la cola y lanza los workers (debe llamarse dentro del event loop)"""
+        if self._workers:
+            return
+        self._handler = handler
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._maxsize)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"webhook-worker-{i}")
+            for i in range(self._num_workers)
+        ]
+        logger.info("WebhookQueue iniciada con %s workers (maxsize=%s)", self._num_workers, self._maxsize)
+
+    def enqueue(self, webhook_data: Dict[str, Any]) -> bool:
+        """Encola un webhook sin bloquear. Retorna False si la cola está llena o detenida"""
+        if self._queue is None:
+            self._stats["dropped"] += 1
+            logger.error("WebhookQueue no iniciada, evento descartado")
+            return False
+        try:
+            self._queue.put_nowait((self._loop.time(), webhook_data))
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            logger.warning("WebhookQueue llena (%s), evento descartado", self._maxsize)
+            return False
+        self._stats["enqueued"] += 1
+        return True
+
+    async def _worker(self, worker_id: int):
+        """Consume eventos de la cola y los procesa secuencialmente"""
+        while True:
+            enqueued_at, webhook_data = await self._queue.get()
+            self._stats["in_flight"] += 1
+            try:
+                await self._handler(webhook_data)
+                self._stats["processed"] += 1
+            except Exception as e:
+                self._stats["failed"] += 1
+                logger.error("Error en webhook-worker-%s: %s", worker_id, e)
+            finally:
+                self._stats["in_flight"] -= 1
+                latency = self._loop.time() - enqueued_at
+                self._stats["total_latency"] += latency
+                self._stats["max_latency"] = max(self._stats["max_latency"], latency)
+                self._queue.task_done()
+
+    async def stop(self, timeout: float = 10.0):
+        """Drena la cola (con timeout) y detiene los workers"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("WebhookQueue detenida con %s eventos pendientes", self._queue.qsize())
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        logger.info("WebhookQueue detenida")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtiene métricas de la cola"""
+        finished = self._stats["processed"] + self._stats["failed"]
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "maxsize": self._maxsize,
+            "workers": len(self._workers),
+            "in_flight": self._stats["in_flight"],
+            "idle_workers": len(self._workers) - self._stats["in_flight"],
+            "enqueued": self._stats["enqueued"],
+            "processed": self._stats["processed"],
+            "failed": self._stats["failed"],
+            "dropped": self._stats["dropped"],
+            "avg_latency": self._stats["total_latency"] / finished if finished else 0.0,
+            "max_latency": self._stats["max_latency"]
+        }
+
+# Instancia global de la cola de webhooks de WhatsApp
+webhook_queue = WebhookQueue(
+    maxsize=settings.WHATSAPP_QUEUE_MAXSIZE,
+    workers=settings.WHATSAPP_WORKERS
+)
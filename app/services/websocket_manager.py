@@ -3,12 +3,16 @@ WebSocket Manager para enviar notificaciones en tiempo real
 """
 import json
 import logging
-from typing import Dict, Set, Optional
+from collections import defaultdict
+from typing import Dict, Iterable, Set, Optional
 from datetime import datetime
 from fastapi import WebSocket
 
 logger = logging.getLogger(__name__)
 
+# Sala por defecto: recibe las actualizaciones de todos los chats (panel admin)
+ALL_CHATS_ROOM = "*"
+
 class WebSocketManager:
     """Maneja conexiones WebSocket activas para notificaciones en tiempo real"""
     
@@ -17,11 +21,15 @@ class WebSocketManager:
         self.active_connections: Set[WebSocket] = set()
         # Mapear usuarios a sus conexiones (para notificaciones específicas)
         self.user_connections: Dict[int, WebSocket] = {}
+        # Salas por chat_id y salas a las que pertenece cada conexión
+        self.rooms: Dict[str, Set[WebSocket]] = defaultdict(set)
+        self.connection_rooms: Dict[WebSocket, Set[str]] = defaultdict(set)
     
     async def connect(self, websocket: WebSocket, user_id: Optional[int] = None):
         """Acepta una nueva conexión WebSocket"""
         await websocket.accept()
         self.active_connections.add(websocket)
+        self._join(websocket, ALL_CHATS_ROOM)
         if user_id:
             self.user_connections[user_id] = websocket
         logger.info(f"Nueva conexión WebSocket activa. Total: {len(self.active_connections)}")
@@ -29,10 +37,37 @@ class WebSocketManager:
     def disconnect(self, websocket: WebSocket, user_id: Optional[int] = None):
         """Remueve una conexión WebSocket"""
         self.active_connections.discard(websocket)
+        for room in self.connection_rooms.pop(websocket, set()):
+            self._leave_room(websocket, room)
         if user_id and user_id in self.user_connections:
             del self.user_connections[user_id]
         logger.info(f"Conexión WebSocket desconectada. Total: {len(self.active_connections)}")
     
+    def subscribe(self, websocket: WebSocket, chat_id: str):
+        """Suscribe la conexión a un chat; deja de recibir las actualizaciones globales"""
+        self._leave(websocket, ALL_CHATS_ROOM)
+        self._join(websocket, chat_id)
+        logger.info(f"Conexión WebSocket suscrita al chat {chat_id}")
+    
+    def unsubscribe(self, websocket: WebSocket, chat_id: str):
+        """Cancela la suscripción de la conexión a un chat"""
+        self._leave(websocket, chat_id)
+    
+    def _join(self, websocket: WebSocket, room: str):
+        self.rooms[room].add(websocket)
+        self.connection_rooms[websocket].add(room)
+    
+    def _leave(self, websocket: WebSocket, room: str):
+        self.connection_rooms[websocket].discard(room)
+        self._leave_room(websocket, room)
+    
+    def _leave_room(self, websocket: WebSocket, room: str):
+        members = self.rooms.get(room)
+        if members is not None:
+            members.discard(websocket)
+            if not members:
+                del self.rooms[room]
+    
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Envía un mensaje a una conexión específica"""
         try:
@@ -49,8 +84,17 @@ class WebSocketManager:
     
     async def broadcast(self, message: str):
         """Envía un mensaje a todas las conexiones activas"""
+        await self._send_many(message, self.active_connections)
+    
+    async def broadcast_to_chat(self, chat_id: str, message: str):
+        """Envía un mensaje solo a los suscriptores del chat y de la sala global"""
+        recipients = self.rooms.get(chat_id, set()) | self.rooms.get(ALL_CHATS_ROOM, set())
+        await self._send_many(message, recipients)
+    
+    async def _send_many(self, message: str, connections: Iterable[WebSocket]):
+        """Envía un mensaje ya serializado a un conjunto de conexiones"""
         disconnected = set()
-        for connection in self.active_connections:
+        for connection in list(connections):
             try:
                 await connection.send_text(message)
             except Exception as e:
@@ -59,10 +103,11 @@ class WebSocketManager:
         
         # Limpiar conexiones muertas
         for connection in disconnected:
-            self.active_connections.discard(connection)
+            self.disconnect(connection)
     
     async def notify_new_message(self, chat_id: str, user_id: int, message: str, is_user: bool = True):
         """Notifica sobre un nuevo mensaje en el chat"""
+        now = datetime.now().isoformat()
         notification = {
             "type": "chat_update",
             "data": {
@@ -70,25 +115,26 @@ class WebSocketManager:
                 "userId": user_id,
                 "ultimoMensaje": message[:100],  # Limitar longitud
                 "isUser": is_user,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now
         }
         
-        await self.broadcast(json.dumps(notification, ensure_ascii=False))
+        await self.broadcast_to_chat(chat_id, json.dumps(notification, ensure_ascii=False))
         logger.info(f"Notificación de nuevo mensaje enviada para chat {chat_id}")
     
     async def notify_user_activity(self, user_id: int, activity: str):
         """Notifica sobre actividad del usuario"""
+        now = datetime.now().isoformat()
         notification = {
             "type": "user_update",
             "data": {
                 "id": user_id,
                 "activity": activity,
                 "isOnline": True,
-                "lastSeen": datetime.now().isoformat()
+                "lastSeen": now
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now
         }
         
         await self.broadcast(json.dumps(notification, ensure_ascii=False))
@@ -0,0 +1,55 @@
+"""
+Worker arq que procesa los webhooks de WhatsApp fuera del proceso web.
+Ejecutar con: arq app.workers.whatsapp_worker.WorkerSettings
+"""
+import logging
+from typing import Any, Dict, Optional
+
+from arq.connections import RedisSettings
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def get_redis_settings() -> RedisSettings:
+    """Configuración de Redis compartida entre la API (productor) y el worker"""
+    return RedisSettings(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        database=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD or None
+    )
+
+def get_message_id(webhook_data: Dict[str, Any]) -> Optional[str]:
+    """ID del mensaje de WhatsApp, usado como job id para deduplicar reintentos de Meta"""
+    try:
+        return webhook_data["entry"][0]["changes"][0]["value"]["messages"][0]["id"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+async def startup(ctx: Dict[str, Any]):
+    from app.controllers.whatsapp.WhatsAppController import get_whatsapp_controller
+    from app.services.service_manager import service_manager
+    ctx["whatsapp_controller"] = get_whatsapp_controller()
+    # El worker también embebe consultas: calentar el modelo antes del primer job
+    service_manager.get_embedding_service().warmup()
+    logger.info("Worker de WhatsApp iniciado")
+
+async def shutdown(ctx: Dict[str, Any]):
+    from app.database import close_async_pool
+    from app.services.service_manager import service_manager
+    # Primero los turnos pendientes de persistir (usan el pool), después el pool
+    await service_manager.close_langroid_service()
+    await service_manager.close_http_client()
+    await close_async_pool()
+    logger.info("Worker de WhatsApp detenido")
+
+async def process_whatsapp(ctx: Dict[str, Any], webhook_data: Dict[str, Any]):
+    await ctx["whatsapp_controller"].process_message(webhook_data)
+
+class WorkerSettings:
+    functions = [process_whatsapp]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = get_redis_settings()
+    max_jobs = settings.WHATSAPP_WORKERS
@@ -1,5 +1,6 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.config import settings
 
 # Import all route modules
@@ -11,11 +12,18 @@ from app.routes.usuario.UsuarioRoutes import router as usuario_router
 from app.routes.chat.ChatRoutes import router as chat_router, admin_router as chat_admin_router, messages_router
 from app.routes.ingest.IngestRoutes import router as ingest_router
 from app.routes.whatsapp.WhatsAppWebhookRoutes import whatsapp_router as whatsapp_webhook_router
+from app.controllers.whatsapp.WhatsAppController import get_whatsapp_controller
 from app.routes.ws_chat import ws_router
 
 from app.services.qdrant import QdrantService
 from app.services.data_sync import DataSyncService
+from app.services.service_manager import service_manager
+from app.database import init_async_pool, close_async_pool
+from app.services.webhook_queue import webhook_queue
 from app.services.langroid_service import LangroidAgentService
+from app.deps import get_langroid
+from app.workers.whatsapp_worker import get_redis_settings
+from arq import create_pool
 import asyncio
 import logging
 
@@ -28,7 +36,8 @@ app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
     description="DeepLearning Backend API with Langroid Multi-Agent System, RAG capabilities, complete CRUD operations, and persistent chat system",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -53,12 +62,27 @@ app.include_router(ingest_router, prefix="/api/v1")
 app.include_router(whatsapp_webhook_router)
 app.include_router(ws_router)
 
-langroid_service = None
+app.state.arq = None
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize RAG components and Langroid Multi-Agent System on application startup"""
-    global langroid_service
+    # Set up WhatsApp webhook processing first so webhooks are accepted even with limited capabilities
+    if settings.WHATSAPP_QUEUE_BACKEND == "arq":
+        try:
+            app.state.arq = await create_pool(get_redis_settings())
+            logger.info("WhatsApp webhooks will be enqueued to arq (Redis)")
+        except Exception as e:
+            logger.error(f"Could not connect to Redis for arq, falling back to in-memory queue: {str(e)}")
+    if app.state.arq is None:
+        webhook_queue.start(get_whatsapp_controller().process_message)
+    # Open the DB pool up front so the first requests don't pay the handshake.
+    # Kept apart: MySQL being down must not skip Qdrant, Langroid or the model warm-up
+    try:
+        await init_async_pool()
+        logger.info("Database connection pool warmed up")
+    except Exception as e:
+        logger.error(f"Could not warm up the database connection pool: {str(e)}")
     try:
         logger.info("Initializing RAG components and Langroid Multi-Agent System...")
         
@@ -68,7 +92,7 @@ async def startup_event():
         logger.info("Qdrant collection initialized successfully")
         
         logger.info("Initializing Langroid Multi-Agent System...")
-        langroid_service = LangroidAgentService()
+        langroid_service = get_langroid()
         if langroid_service.is_available():
             logger.info("✅ Langroid Multi-Agent System initialized successfully")
             agent_info = langroid_service.get_agent_info()
@@ -76,6 +100,10 @@ async def startup_event():
         else:
             logger.warning("⚠️ Langroid system initialized but agents not available")
         
+        # Warm up the embedding model so the first user doesn't pay the cold start
+        service_manager.get_embedding_service().warmup()
+        logger.info("Embedding model warmed up")
+        
         logger.info("Starting initial data synchronization...")
         data_sync = DataSyncService()
         sync_result = await data_sync.sync_all_data()
@@ -92,6 +120,18 @@ async def startup_event():
         # Don't fail startup, but log the error
         logger.warning("Application started with limited capabilities")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release shared resources on application shutdown"""
+    await webhook_queue.stop()
+    if app.state.arq is not None:
+        await app.state.arq.aclose()
+        app.state.arq = None
+    await service_manager.close_langroid_service()
+    await service_manager.close_http_client()
+    await service_manager.close_async_redis_cache()
+    await close_async_pool()
+
 @app.get("/")
 def read_root():
     """Root endpoint"""
@@ -118,6 +158,11 @@ def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/metrics")
+def metrics():
+    """Runtime metrics for the WhatsApp webhook queue"""
+    return {"whatsapp_queue": webhook_queue.get_stats()}
+
 @app.get("/rag-status")
 async def rag_status():
     """Check RAG system status"""
@@ -135,22 +180,14 @@ async def rag_status():
         }
 
 @app.get("/langroid-status")
-async def langroid_status():
+async def langroid_status(langroid: LangroidAgentService = Depends(get_langroid)):
     """Check Langroid Multi-Agent System status"""
-    global langroid_service
     try:
-        if langroid_service:
-            agent_info = langroid_service.get_agent_info()
-            return {
-                "langroid_enabled": True,
-                "agents_available": langroid_service.is_available(),
-                "system_info": agent_info
-            }
-        else:
-            return {
-                "langroid_enabled": False,
-                "error": "Langroid service not initialized"
-            }
+        return {
+            "langroid_enabled": True,
+            "agents_available": langroid.is_available(),
+            "system_info": langroid.get_agent_info()
+        }
     except Exception as e:
         return {
             "langroid_enabled": False,
@@ -158,9 +195,8 @@ async def langroid_status():
         }
 
 @app.get("/api/v1/assistant")
-async def get_assistant_info():
+async def get_assistant_info(langroid: LangroidAgentService = Depends(get_langroid)):
     """Información del asistente comercial"""
-    global langroid_service
     base_info = {
         "name": "HypatIA 🎓",
         "type": "multi_agent_educational_assistant",
@@ -176,8 +212,8 @@ async def get_assistant_info():
         ]
     }
     
-    if langroid_service and langroid_service.is_available():
-        langroid_info = langroid_service.get_agent_info()
+    if langroid.is_available():
+        langroid_info = langroid.get_agent_info()
         base_info.update({
             "framework": langroid_info.get("framework"),
             "agents": langroid_info.get("agents"),
@@ -187,21 +223,15 @@ async def get_assistant_info():
     return base_info
 
 @app.get("/api/v1/conversation-analytics")
-async def get_conversation_analytics(chat_id: int = None, user_id: int = None):
+async def get_conversation_analytics(chat_id: int = None, user_id: int = None,
+                                     langroid: LangroidAgentService = Depends(get_langroid)):
     """Get conversation analytics from Langroid system"""
-    global langroid_service
     try:
-        if langroid_service:
-            analytics = await langroid_service.get_conversation_analytics(chat_id, user_id)
-            return {
-                "status": "success",
-                "data": analytics
-            }
-        else:
-            return {
-                "status": "error",
-                "message": "Langroid service not available"
-            }
+        analytics = await langroid.get_conversation_analytics(chat_id, user_id)
+        return {
+            "status": "success",
+            "data": analytics
+        }
     except Exception as e:
         return {
             "status": "error",
@@ -209,21 +239,15 @@ async def get_conversation_analytics(chat_id: int = None, user_id: int = None):
         }
 
 @app.post("/api/v1/reset-conversation")
-async def reset_conversation_context(user_id: int = None):
+async def reset_conversation_context(user_id: int = None,
+                                     langroid: LangroidAgentService = Depends(get_langroid)):
     """Reset conversation context for user"""
-    global langroid_service
     try:
-        if langroid_service:
-            await langroid_service.reset_conversation_context(user_id)
-            return {
-                "status": "success",
-                "message": f"Contexto de conversación reseteado para usuario {user_id}"
-            }
-        else:
-            return {
-                "status": "error",
-                "message": "Langroid service not available"
-            }
+        await langroid.reset_conversation_context(user_id)
+        return {
+            "status": "success",
+            "message": f"Contexto de conversación reseteado para usuario {user_id}"
+        }
     except Exception as e:
         return {
             "status": "error",
@@ -232,7 +256,6 @@ async def reset_conversation_context(user_id: int = None):
 
 
 from fastapi import HTTPException
-import requests
 
 @app.post("/setup-webhook")
 async def setup_webhook(webhook_url: str):
@@ -247,7 +270,7 @@ async def setup_webhook(webhook_url: str):
     telegram_url = f"https://api.telegram.org/bot{Config.TELEGRAM_BOT_TOKEN}/setWebhook"
 
     try:
-        response = requests.post(telegram_url, json={"url": full_webhook_url})
+        response = await service_manager.get_http_client().post(telegram_url, json={"url": full_webhook_url})
         result = response.json()
         if result.get("ok"):
             return {
@@ -267,7 +290,7 @@ async def get_webhook_info():
     from app.config import Config
     telegram_url = f"https://api.telegram.org/bot{Config.TELEGRAM_BOT_TOKEN}/getWebhookInfo"
     try:
-        response = requests.get(telegram_url)
+        response = await service_manager.get_http_client().get(telegram_url)
         result = response.json()
         if result.get("ok"):
             webhook_info = result.get("result", {})
@@ -290,7 +313,7 @@ async def delete_webhook():
     from app.config import Config
     telegram_url = f"https://api.telegram.org/bot{Config.TELEGRAM_BOT_TOKEN}/deleteWebhook"
     try:
-        response = requests.post(telegram_url)
+        response = await service_manager.get_http_client().post(telegram_url)
         result = response.json()
         if result.get("ok"):
             return {
@@ -346,14 +369,18 @@ async def global_exception_handler(request, exc):
 if __name__ == "__main__":
     import uvicorn
     import os
+    import sys
     
     # Obtener puerto y host de variables de entorno (para Render) o usar valores por defecto
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
     
+    # uvloop + httptools when available (uvloop is not supported on Windows)
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools"
     )
\ No newline at end of file